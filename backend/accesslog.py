@@ -0,0 +1,134 @@
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+_STOP = object()
+
+
+class AccessLog:
+    """
+    Structured access log written by a background thread, so request threads never wait
+    on stdout or the disk. Records go onto a bounded queue; when it is full they are
+    dropped and counted instead of slowing the server down.
+
+      target:   "-" for stdout, a file path (appended to), or None to log nothing
+      sample:   fraction of requests logged (5xx responses and errors are always logged)
+      fmt:      "json" (one object per line) or "text"
+      batch:    records written per write() call at most
+    """
+
+    def __init__(self, target="-", sample=1.0, fmt="json", queue_size=10_000, batch=256,
+                 flush_interval=0.5):
+        if fmt not in ("json", "text"):
+            raise ValueError(f"unknown access log format {fmt!r}")
+        self.target = target
+        self.sample = sample
+        self.fmt = fmt
+        self.batch = batch
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.written = 0      # only the writer thread adds to this one
+        self.dropped = 0
+        self.sampled_out = 0
+        self._count_lock = threading.Lock()  # dropped/sampled_out: bumped by every request thread
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    # ---------- producers (request threads) ----------
+
+    def access(self, method, path, status, duration_ms, nbytes, user_id=None, ip=None):
+        if self.target is None:
+            return
+        if status < 500 and self.sample < 1.0 and random.random() >= self.sample:
+            with self._count_lock:
+                self.sampled_out += 1
+            return
+        self._put({
+            "ts": round(time.time(), 3), "method": method, "path": path, "status": status,
+            "ms": round(duration_ms, 2), "bytes": nbytes, "user": user_id, "ip": ip,
+        })
+
+    def error(self, message):
+        """Tracebacks and server messages; never sampled, written to stderr when logging is off."""
+        if self.target is None:
+            sys.stderr.write(message.rstrip("\n") + "\n")
+            return
+        self._put({"ts": round(time.time(), 3), "level": "error", "message": message.rstrip("\n")})
+
+    def _put(self, record):
+        q = self._queue
+        if q is None or self._pid != os.getpid():
+            q = self._start()
+        try:
+            q.put_nowait(record)
+        except queue.Full:
+            with self._count_lock:
+                self.dropped += 1
+
+    def stats(self):
+        return {"written": self.written, "dropped": self.dropped, "sampled_out": self.sampled_out,
+                "queued": self._queue.qsize() if self._queue is not None else 0}
+
+    # ---------- writer thread ----------
+
+    def _start(self):
+        with self._lock:
+            if self._queue is None or self._pid != os.getpid():
+                # first use, or a forked worker: the parent's thread didn't come with us
+                self._pid = os.getpid()
+                self._queue = queue.Queue(self.queue_size)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name="pyreactx-accesslog", daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def _run(self, q):
+        out = sys.stdout if self.target == "-" else open(self.target, "a", encoding="utf-8")
+        try:
+            stopping = False
+            while not stopping:
+                try:
+                    records = [q.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                while len(records) < self.batch:
+                    try:
+                        records.append(q.get_nowait())
+                    except queue.Empty:
+                        break
+                if any(r is _STOP for r in records):
+                    records = [r for r in records if r is not _STOP]
+                    stopping = True
+                if records:
+                    out.write("".join(self._format(r) for r in records))
+                    out.flush()
+                    self.written += len(records)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+    def _format(self, record):
+        if self.fmt == "json":
+            return json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        if "message" in record:
+            return f"[ERROR] {record['message']}\n"
+        user = record["user"] if record["user"] is not None else "-"
+        return (f"{record['ip'] or '-'} {record['method']} {record['path']} {record['status']} "
+                f"{record['bytes']}B {record['ms']}ms user={user}\n")
+
+    def close(self, timeout=5.0):
+        """Write out what is queued and stop the writer (call once per process on shutdown)."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._queue = None
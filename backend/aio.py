@@ -0,0 +1,284 @@
+import asyncio
+import concurrent.futures
+import http.client
+import inspect
+import io
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http import HTTPStatus
+from urllib.parse import urlparse
+
+MAX_HEADER_BYTES = 64 * 1024
+METHODS = {"GET", "POST", "PATCH", "DELETE", "OPTIONS"}
+
+
+def to_async(handler):
+    """Plain handlers run in the loop's executor so they never block it."""
+    if inspect.iscoroutinefunction(handler):
+        return handler
+
+    async def leaf(request):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, handler, request)
+    return leaf
+
+
+async def maybe_await(value):
+    """
+    Middleware that wants to work under both engines can do:
+        result = await maybe_await(next_handler(request))
+    """
+    while inspect.isawaitable(value):
+        value = await value
+    return value
+
+
+def _response(status, body=b"", headers=None, keep_alive=True, timeout=5, max_requests=100,
+              framing="length"):
+    """framing: "length" (Content-Length), "chunked", or "close" (body ends at EOF)"""
+    try:
+        phrase = HTTPStatus(status).phrase
+    except ValueError:
+        phrase = ""  # codes without a standard reason go out without one, as in http.server
+    lines = [
+        f"HTTP/1.1 {status} {phrase}",
+        "Server: PyReactX-async",
+        f"Date: {formatdate(usegmt=True)}",
+    ]
+    if framing == "length" and status not in (204, 304):  # RFC 9110 8.6
+        lines.append(f"Content-Length: {len(body)}")
+    elif framing == "chunked":
+        lines.append("Transfer-Encoding: chunked")
+    for k, v in (headers or {}).items():
+        lines.append(f"{k}: {v}")
+    if keep_alive:
+        lines.append(f"Keep-Alive: timeout={int(timeout)}, max={max_requests}")
+    else:
+        lines.append("Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def serve_async(app, host, port, cors, threads=8, backlog=128,
+                      keepalive_timeout=5, keepalive_max_requests=100, grace=10.0,
+                      stopping=None, ready=None):
+    """
+    Serve until SIGTERM/SIGINT (or until the `stopping` asyncio.Event is set), then drain for
+    up to `grace` seconds. ready((host, port)) is called once listening, e.g. to learn the
+    port picked for port=0.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pyreactx-async")
+    loop.set_default_executor(executor)
+    stopping = stopping if stopping is not None else asyncio.Event()
+    connections = set()  # connection tasks
+    idle = set()         # writers waiting for their next request
+
+    def json_response(obj, status, keep_alive, extra=None, accept_encoding=None):
+        status, data, headers = app._render(obj, status, extra, accept_encoding)
+        headers.update(cors)
+        return _response(status, data, headers, keep_alive, keepalive_timeout, keepalive_max_requests)
+
+    async def stream_chunks(source):
+        """Encoded chunks from a streamed body; sync sources are pulled on an executor thread."""
+        if hasattr(source, "__anext__"):
+            try:
+                async for item in source:
+                    yield app._encode_chunk(item)
+            finally:
+                await source.aclose() if hasattr(source, "aclose") else None
+            return
+
+        # a small queue between the producer thread and the socket gives backpressure
+        queue = asyncio.Queue(maxsize=4)
+        stop = threading.Event()
+        end = object()
+
+        def put(item):
+            future = asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+            while True:
+                try:
+                    future.result(timeout=0.5)
+                    return True
+                except concurrent.futures.TimeoutError:
+                    if stop.is_set():
+                        future.cancel()
+                        return False
+
+        def produce():
+            chunks = app._stream_chunks(source)
+            try:
+                for data in chunks:
+                    if not put(data):
+                        return
+                put(end)
+            except Exception as e:
+                put(e)
+            finally:
+                chunks.close()
+
+        loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    async def write_stream(writer, source, chunked, done):
+        """-> True when the whole body went out; done(bytes sent) is called either way"""
+        chunks = stream_chunks(source)
+        sent = 0
+        try:
+            async for data in chunks:
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+                sent += len(data)
+                await writer.drain()  # waits while the client is slow to read
+            if chunked:
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+            return True
+        except ConnectionError:
+            return False  # client went away
+        except Exception as e:
+            app._server_error(e)  # headers are out, so just cut the stream short
+            return False
+        finally:
+            await chunks.aclose()
+            done(sent)
+
+    async def handle_one(head, reader, ip, served):
+        """-> (response bytes, keep connection open, streamed body or None)"""
+        started = time.perf_counter()
+        request_line, _, rest = head.partition(b"\r\n")
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            return json_response({"error": "Bad request"}, 400, False), False, None
+        headers = http.client.parse_headers(io.BytesIO(rest))
+
+        conn_hdr = (headers.get("Connection") or "").lower()
+        if version == "HTTP/1.1":
+            keep = conn_hdr != "close"
+        else:
+            keep = conn_hdr == "keep-alive"
+        keep = keep and served < keepalive_max_requests and not stopping.is_set()
+
+        if headers.get("Transfer-Encoding"):
+            return json_response({"error": "Chunked request bodies not supported"}, 501, False), False, None
+        try:
+            length = int(headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError
+        except ValueError:
+            return json_response({"error": "Bad Content-Length"}, 400, False), False, None
+        parsed = urlparse(target)
+        pattern = None  # set once a route matches
+
+        def reply(obj, status, extra=None, request=None, accept_encoding=None):
+            status, data, out = app._render(obj, status, extra, accept_encoding)
+            app._record_request(method, pattern, parsed.path, status, started, len(data), ip, request)
+            out.update(cors)
+            return _response(status, data, out, keep, keepalive_timeout, keepalive_max_requests)
+
+        too_large = app._body_too_large(length)
+        if too_large:
+            keep = False
+            return reply(too_large, 413), keep, None
+        body = await reader.readexactly(length) if length > 0 else b""
+
+        if method == "OPTIONS":
+            return _response(204, b"", cors, keep, keepalive_timeout, keepalive_max_requests), keep, None
+        if method not in METHODS:
+            return json_response({"error": f"Unsupported method ({method!r})"}, 501, keep), keep, None
+
+        handler, path_params, route, allowed = app.router.lookup(method, parsed.path)
+        if route is not None:
+            pattern = route.pattern
+        if handler is None:
+            if allowed is None:
+                return reply({"error": "Route not found"}, 404), keep, None
+            return reply({"error": f"Method {method} not allowed"}, 405, {"Allow": ", ".join(allowed)}), keep, None
+
+        request = app._build_request(method, parsed, headers, path_params, lambda: body, ip)
+        chain = app._chain(route.pattern, method, handler, "async")
+        try:
+            result = await maybe_await(chain(request))
+        except Exception as e:
+            result = app._server_error(e)
+        keep = keep and not stopping.is_set()  # stopped meanwhile: this is the last response
+        out_body, status, out_headers = app._split_result(result)
+        if app._is_stream(out_body):
+            status, source, out_headers = app._stream_head(out_body, status, out_headers)
+            chunked = version == "HTTP/1.1"
+            keep = keep and chunked  # HTTP/1.0: the body ends when we close
+            out_headers.update(cors)
+            head = _response(status, b"", out_headers, keep, keepalive_timeout, keepalive_max_requests,
+                             framing="chunked" if chunked else "close")
+
+            def done(sent):
+                app._record_request(method, pattern, parsed.path, status, started, sent, ip, request)
+            return head, keep, (source, chunked, done)
+        return reply(out_body, status, out_headers, request, headers.get("Accept-Encoding")), keep, None
+
+    async def client(reader, writer):
+        task = asyncio.current_task()
+        connections.add(task)
+        peer = writer.get_extra_info("peername")
+        ip = peer[0] if peer else ""
+        served = 0
+        try:
+            while not stopping.is_set():
+                idle.add(writer)
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), keepalive_timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                        asyncio.LimitOverrunError, ConnectionError):
+                    break
+                finally:
+                    idle.discard(writer)
+                served += 1
+                try:
+                    data, keep, stream = await handle_one(head, reader, ip, served)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                writer.write(data)
+                await writer.drain()
+                if stream is not None and not await write_stream(writer, *stream):
+                    break
+                if not keep:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            connections.discard(task)
+            writer.close()
+
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    server = await asyncio.start_server(client, host, port, backlog=backlog,
+                                        limit=MAX_HEADER_BYTES, reuse_address=True)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[:2])
+    try:
+        await stopping.wait()
+    finally:
+        # drain: stop accepting, hang up idle keep-alive clients, let busy ones finish
+        server.close()
+        for writer in list(idle):
+            writer.close()
+        if connections:
+            _done, pending = await asyncio.wait(list(connections), timeout=grace)
+            for task in pending:
+                task.cancel()
+        executor.shutdown(wait=True)
@@ -1,118 +1,617 @@
+import asyncio
+import hashlib
+import inspect
 import json
-import re
-from urllib.parse import urlparse, parse_qs
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from . import compress, metrics
+from .accesslog import AccessLog
+from .aio import maybe_await, serve_async, to_async
+from .request import Request
+from .router import Router
+from .server import KeepAliveHandler, serve
+
+
+# Optional faster JSON encoder if orjson is installed.
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+
+def default_json_dumps(obj):
+    """obj -> bytes, using orjson when available and the stdlib otherwise"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # something orjson can't encode; let the stdlib try (and report)
+    return json.dumps(obj).encode()
+
+
+def cors_headers(allow_origin):
+    return {
+        "Access-Control-Allow-Origin": allow_origin,
+        "Access-Control-Allow-Headers": "Content-Type, Authorization",
+        "Access-Control-Allow-Methods": "GET,POST,PATCH,DELETE,OPTIONS",
+    }
+
+
+class Response:
+    """Pre-encoded response; handlers may return one instead of a JSON-able body."""
+    __slots__ = ("body", "status", "headers", "content_type", "variants")
+
+    def __init__(self, body=b"", status=200, headers=None, content_type="application/json"):
+        self.body = body
+        self.status = status
+        self.headers = headers or {}
+        self.content_type = content_type
+        self.variants = None  # encoding -> compressed body, kept for cached responses
+
+
+class Stream:
+    """
+    Streamed body, sent with chunked transfer encoding. `iterable` (sync or async) yields
+    bytes/str chunks, or other objects that are sent as one JSON line each (NDJSON).
+    Handlers may also return a bare generator/iterator, which is treated the same way.
+    """
+    __slots__ = ("iterable", "status", "headers", "content_type")
+
+    def __init__(self, iterable, status=200, headers=None, content_type="application/x-ndjson"):
+        self.iterable = iterable
+        self.status = status
+        self.headers = headers or {}
+        self.content_type = content_type
+
+
+def is_stream(body):
+    return isinstance(body, Stream) or hasattr(body, "__next__") or hasattr(body, "__anext__")
+
+
+def _header(request, name):
+    if isinstance(request, Request):
+        return request.header(name)
+    headers = request["headers"]
+    value = headers.get(name)
+    if value is None:
+        lname = name.lower()
+        for k, v in headers.items():
+            if k.lower() == lname:
+                return v
+    return value
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: W/"x" matches "x"; any encoding of the body matches too
+    return any(compress.base_etag(tag.strip().removeprefix("W/")) == etag
+               for tag in if_none_match.split(","))
+
+
+class _ResponseCache:
+    """
+    Encoded 200 responses of one route, keyed by path + query, with a strong ETag.
+    A matching If-None-Match is answered with 304 without calling the handler.
+    Beyond max_entries the least recently used entry is dropped.
+    """
+    max_entries = 256
+
+    def __init__(self, app, cache_control):
+        self.app = app
+        self.cache_control = cache_control
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request):
+        query = request["query"]
+        return request["path"] if not query else (request["path"], json.dumps(query, sort_keys=True))
+
+    def lookup(self, request):
+        key = self.key(request)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        return self.answer(request, entry) if entry is not None else None
+
+    def answer(self, request, entry):
+        encoding = None
+        if len(entry.body) >= self.app.compress_min_size and compress.compressible(entry.content_type):
+            encoding = compress.negotiate(_header(request, "Accept-Encoding"))
+        etag = entry.headers["ETag"]
+        if encoding:
+            etag = compress.variant_etag(etag, encoding)
+        inm = _header(request, "If-None-Match")
+        if inm and _etag_matches(inm, entry.headers["ETag"]):
+            return Response(b"", 304, {"ETag": etag, "Cache-Control": self.cache_control,
+                                       "Vary": "Accept-Encoding"})
+        if not encoding:
+            return entry
+        body = entry.variants.get(encoding)
+        if body is None:
+            body = entry.variants[encoding] = compress.ENCODERS[encoding](entry.body)
+        return Response(body, 200, {**entry.headers, "ETag": etag, "Content-Encoding": encoding},
+                        entry.content_type)
+
+    def store(self, request, result):
+        body, status, headers = App._split_result(result)
+        if status != 200 or isinstance(body, Response) or is_stream(body):
+            return result
+        data = self.app.json_dumps(body)
+        etag = '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+        entry = Response(data, 200, {**(headers or {}), "ETag": etag, "Cache-Control": self.cache_control,
+                                     "Vary": "Accept-Encoding"})
+        entry.variants = {}
+        key = self.key(request)
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return self.answer(request, entry)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+    def wrap(self, handler):
+        if inspect.iscoroutinefunction(handler):
+            async def cached(request):
+                return self.lookup(request) or self.store(request, await handler(request))
+        else:
+            def cached(request):
+                return self.lookup(request) or self.store(request, handler(request))
+        return cached
+
 
 class App:
-    def __init__(self):
+    def __init__(self, json_dumps=None, compress_min_size=1024, max_body_size=1024 * 1024,
+                 access_log=None, profiler=None):
+        """
+        json_dumps: obj -> bytes, defaults to orjson when installed, else the stdlib.
+        compress_min_size: bodies at least this big are gzip/brotli-compressed when the
+        client's Accept-Encoding allows it (None disables compression).
+        max_body_size: larger request bodies get 413 without being read.
+        access_log: an AccessLog (default: JSON lines on stdout); AccessLog(None) turns it off.
+        profiler: a profiling.Profiler to profile chosen requests with (blocking engines only).
+        """
+        self.max_body_size = max_body_size
+        self.access_log = access_log if access_log is not None else AccessLog()
+        self.profiler = profiler
+        self.json_dumps = json_dumps or default_json_dumps
+        self.compress_min_size = compress_min_size if compress_min_size is not None else float("inf")
         # routes[pattern][method] = handler
         self.routes = {}
         self.middlewares = []
+        self.router = Router()
+        self.route_middlewares = {}  # (pattern, method) -> [middleware]
+        self._chains = {}            # (pattern, method, engine) -> (handler, composed chain)
+        self.response_caches = {}    # (pattern, method) -> _ResponseCache
+        self.startup_hooks = []
+        self.shutdown_hooks = []
+        self._started = False
 
-    def route(self, path, methods=["GET"]):
+    def route(self, path, methods=["GET"], middlewares=None, cache=None):
+        """
+        path may contain `:name` or typed `:name<int>` segments.
+        middlewares apply to this route only, inside the global ones from use().
+        cache="<Cache-Control value>" (GET only) encodes 200 responses once, serves them with a
+        strong ETag and answers matching If-None-Match with 304. Only for responses that
+        don't depend on the caller; middlewares still run on every request.
+        """
         def decorator(func):
             if path not in self.routes:
                 self.routes[path] = {}
+                self.router.add(path, self.routes[path])
             for m in methods:
                 self.routes[path][m.upper()] = func
+                self.route_middlewares[(path, m.upper())] = list(middlewares or [])
+                if cache and m.upper() == "GET":
+                    self.response_caches[(path, "GET")] = _ResponseCache(self, cache)
+                else:
+                    self.response_caches.pop((path, m.upper()), None)
+            self._chains.clear()
             return func
         return decorator
 
     def use(self, middleware):
-        """middleware(next_handler) -> wrapped_handler"""
+        """
+        middleware(next_handler) -> wrapped_handler
+        wrapped_handler may be `async def`; use `await maybe_await(next_handler(request))`
+        inside it so the same middleware works under run() and run_async().
+        """
         self.middlewares.append(middleware)
+        self._chains.clear()
+
+    def on_startup(self, fn):
+        """
+        Decorator: fn() runs once before serving (migrations, seeding, warm-up). In prefork
+        mode it runs in the master before workers are forked, so they start ready.
+        fn may be `async def`. Hooks run in registration order; an exception stops startup.
+        """
+        self.startup_hooks.append(fn)
+        return fn
+
+    def on_shutdown(self, fn):
+        """
+        Decorator: fn() runs once in every serving process after it stops, in reverse
+        registration order: in prefork mode in each worker (which holds its own pooled
+        connections) and then in the master. Errors are logged and the next hook still runs.
+        """
+        self.shutdown_hooks.append(fn)
+        return fn
+
+    def startup(self):
+        """Run the startup hooks (once; run() calls this, tests may call it directly)."""
+        if self._started:
+            return
+        self._started = True
+        for fn in self.startup_hooks:
+            _call_hook(fn)
 
-    def _apply_middlewares(self, handler):
+    def shutdown(self):
+        """Run the shutdown hooks if startup() ran, then flush the access log."""
+        if self._started:
+            self._started = False
+            for fn in reversed(self.shutdown_hooks):
+                try:
+                    _call_hook(fn)
+                except Exception as e:
+                    self._server_error(e)
+        self.access_log.close()
+
+    def _apply_middlewares(self, handler, route_middlewares=()):
         wrapped = handler
+        for mw in reversed(route_middlewares):
+            wrapped = mw(wrapped)
         for mw in reversed(self.middlewares):
             wrapped = mw(wrapped)
         return wrapped
 
-    # support patterns like /todos/:id and /users/:id
+    def _chain(self, pattern, method, handler, engine="sync"):
+        """Composed middleware chain for (pattern, method), built once per engine and cached."""
+        key = (pattern, method, engine)
+        cached = self._chains.get(key)
+        # the handler check catches routes swapped out directly through app.routes
+        if cached is not None and cached[0] is handler:
+            return cached[1]
+        leaf = handler
+        response_cache = self.response_caches.get((pattern, method))
+        if response_cache is not None:
+            leaf = response_cache.wrap(leaf)
+        if engine == "async":
+            leaf = to_async(leaf)
+        chain = self._apply_middlewares(leaf, self.route_middlewares.get((pattern, method), ()))
+        self._chains[key] = (handler, chain)
+        return chain
+
+    def freeze(self, engine="sync"):
+        """Precompose every route's chain (run() does this before serving)."""
+        for pattern, methods in self.routes.items():
+            for method, handler in methods.items():
+                self._chain(pattern, method, handler, engine)
+
+    @staticmethod
+    def _build_request(method, parsed, headers, path_params, read_body, ip):
+        """The Request every handler and middleware sees, whichever engine is serving."""
+        return Request(method, parsed.path, headers, parsed.query, path_params, read_body, ip)
+
+    def _body_too_large(self, length):
+        if length > self.max_body_size:
+            return {"error": "Request body too large", "max_bytes": self.max_body_size}
+        return None
+
+    @staticmethod
+    def _split_result(result):
+        """handler result -> (body, status, headers); handlers return body, (body, status) or (body, status, headers)"""
+        if isinstance(result, tuple):
+            if len(result) == 2:
+                return result[0], result[1], None
+            if len(result) == 3:
+                return result
+        return result, 200, None
+
+    def expose_metrics(self, path="/metrics", middlewares=None):
+        """Serve metrics.REGISTRY as Prometheus text on `path` (guard it with middlewares if needed)."""
+        registry = metrics.REGISTRY
+        access_log = self.access_log
+
+        def access_log_stats():
+            stats = access_log.stats()
+            return [("pyreactx_access_log_records_total", "counter", "Access log records by outcome",
+                     [((("outcome", k),), stats[k]) for k in ("written", "dropped", "sampled_out")])]
+        registry.collectors.append(access_log_stats)
+
+        def metrics_endpoint(request):
+            return Response(registry.render().encode(), content_type="text/plain; version=0.0.4; charset=utf-8")
+        self.route(path, methods=["GET"], middlewares=middlewares)(metrics_endpoint)
+
+    def clear_response_cache(self, pattern=None):
+        for (p, _m), response_cache in self.response_caches.items():
+            if pattern is None or p == pattern:
+                response_cache.clear()
+
+    def _render(self, body, status, headers, accept_encoding=None):
+        """-> (status, bytes, headers) ready for the wire, compressed if negotiated"""
+        if isinstance(body, Response):
+            status, data = body.status, body.body
+            out = {"Content-Type": body.content_type, **body.headers}
+        else:
+            data = self.json_dumps(body)
+            out = {"Content-Type": "application/json"}
+        if headers:
+            out.update(headers)
+        if status in (204, 304):
+            data = b""  # neither may have a body
+        if status == 304:
+            out.pop("Content-Type", None)  # a 304 stands for the stored 200; it has no body of its own
+        if (status not in (204, 304) and "Content-Encoding" not in out
+                and compress.compressible(out["Content-Type"])):
+            compress.add_vary(out)
+            if len(data) >= self.compress_min_size:
+                encoding = compress.negotiate(accept_encoding)
+                if encoding:
+                    data = compress.ENCODERS[encoding](data)
+                    out["Content-Encoding"] = encoding
+        return status, data, out
+
+    _is_stream = staticmethod(is_stream)
+
+    def _stream_head(self, body, status, headers):
+        """-> (status, source iterable, headers) for a streamed body"""
+        if isinstance(body, Stream):
+            status, source = body.status, body.iterable
+            out = {"Content-Type": body.content_type, **body.headers}
+        else:
+            source = body
+            out = {"Content-Type": "application/x-ndjson"}
+        if hasattr(source, "__aiter__") and not hasattr(source, "__anext__"):
+            source = source.__aiter__()
+        if headers:
+            out.update(headers)
+        return status, source, out
+
+    def _encode_chunk(self, item):
+        if isinstance(item, bytes):
+            return item
+        if isinstance(item, str):
+            return item.encode()
+        return self.json_dumps(item) + b"\n"
+
+    def _stream_chunks(self, source, buffer_size=16 * 1024):
+        """bytes chunks of roughly buffer_size from a sync iterable; closes the source when done"""
+        buf, size = [], 0
+        try:
+            for item in source:
+                data = self._encode_chunk(item)
+                buf.append(data)
+                size += len(data)
+                if size >= buffer_size:
+                    yield b"".join(buf)
+                    buf, size = [], 0
+            if buf:
+                yield b"".join(buf)
+        finally:
+            close = getattr(source, "close", None)
+            if close is not None:
+                close()  # e.g. lets a query_iter() generator release its cursor
+
+    def _server_error(self, e):
+        self.access_log.error(traceback.format_exc())
+        return {"error": "Internal Server Error", "detail": str(e)}, 500, None
+
+    def _record_request(self, method, pattern, path, status, started, nbytes, ip, request=None):
+        """Access log + metrics for one finished request; pattern is None when no route matched."""
+        elapsed = time.perf_counter() - started
+        if metrics.REGISTRY.enabled:
+            route = pattern or "unmatched"
+            metrics.inc("pyreactx_http_requests_total", (("route", route), ("method", method), ("status", status)))
+            metrics.observe("pyreactx_http_request_duration_seconds", (("route", route), ("method", method)), elapsed)
+        user = request.get("user") if request is not None else None
+        self.access_log.access(method, path, status, elapsed * 1000.0, nbytes,
+                               user.get("id") if isinstance(user, dict) else None, ip)
+
     def _match_route(self, raw_path):
         parsed = urlparse(raw_path)
-        path_only = parsed.path
-        for pattern, methods in self.routes.items():
-            # convert `:id` into a named regex group
-            regex = re.sub(r":([a-zA-Z_][a-zA-Z0-9_]*)", r"(?P<\1>[^/]+)", pattern)
-            m = re.fullmatch(regex, path_only)
-            if m:
-                return methods, m.groupdict(), parsed
-        return None, None, parsed
-
-    def run(self, host="127.0.0.1", port=5000, allow_origin="*"):
+        route, params = self.router.match(parsed.path)
+        if route is None:
+            return None, None, parsed
+        return route.methods, params, parsed
+
+    def run(self, host="127.0.0.1", port=5000, allow_origin="*",
+            mode="single", workers=2, threads=8, backlog=128,
+            keepalive_timeout=5, keepalive_max_requests=100):
+        """
+        mode="single"   one request at a time (the original behaviour)
+        mode="threaded" `threads` worker threads, `backlog` pending connections
+        mode="prefork"  `workers` processes sharing one socket, each with `threads` threads
+        mode="async"    asyncio event loop, see run_async()
+        Connections are kept alive (HTTP/1.1) whenever a process has more than one thread.
+        """
+        if mode == "async":
+            return self.run_async(host, port, allow_origin, threads=threads, backlog=backlog,
+                                  keepalive_timeout=keepalive_timeout,
+                                  keepalive_max_requests=keepalive_max_requests)
+        self.freeze()
+        handler_cls = self._handler_class(allow_origin, keepalive_timeout, keepalive_max_requests)
+        self.startup()
+        print(f"✅ Server running at http://{host}:{port} ({mode})")
+        try:
+            # on_exit: prefork workers leave through os._exit, so they shut down there
+            serve(handler_cls, host, port, mode=mode, workers=workers, threads=threads, backlog=backlog,
+                  on_exit=self.shutdown)
+        finally:
+            self.shutdown()
+
+    def _handler_class(self, allow_origin="*", keepalive_timeout=5, keepalive_max_requests=100):
+        """The request handler class the blocking engines (single/threaded/prefork) serve with."""
         app = self
+        cors = cors_headers(allow_origin)
+
+        class Handler(KeepAliveHandler):
+            timeout = keepalive_timeout
+            max_requests = keepalive_max_requests
 
-        class Handler(BaseHTTPRequestHandler):
-            def _send_json(self, obj, status=200):
-                data = json.dumps(obj).encode()
+            def _send_json(self, obj, status=200, headers=None):
+                status, data, headers = app._render(obj, status, headers, self.headers.get("Accept-Encoding"))
                 self.send_response(status)
-                self.send_header("Content-Type", "application/json")
-                self.send_header("Access-Control-Allow-Origin", allow_origin)
-                self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
-                self.send_header("Access-Control-Allow-Methods", "GET,POST,PATCH,DELETE,OPTIONS")
+                if status not in (204, 304):  # no Content-Length on those (RFC 9110 8.6)
+                    self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                for k, v in cors.items():
+                    self.send_header(k, v)
                 self.end_headers()
                 self.wfile.write(data)
+                return status, len(data)
 
-            def _read_json(self):
-                length = int(self.headers.get("Content-Length") or 0)
-                if length == 0:
-                    return None
-                raw = self.rfile.read(length)
+            def _send_stream(self, body, status, headers):
+                """-> (status, body bytes sent)"""
+                status, source, headers = app._stream_head(body, status, headers)
+                if hasattr(source, "__anext__"):
+                    source = _drain_async_iterable(source)
+                chunked = self.request_version == "HTTP/1.1"
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                for k, v in cors.items():
+                    self.send_header(k, v)
+                if chunked:
+                    self.send_header("Transfer-Encoding", "chunked")
+                else:
+                    self.send_header("Connection", "close")  # HTTP/1.0: body ends at EOF
+                self.end_headers()
+                chunks = app._stream_chunks(source)
+                sent = 0
                 try:
-                    return json.loads(raw.decode())
-                except Exception:
-                    return None
+                    # blocking writes: a slow reader holds the producer back (backpressure)
+                    for data in chunks:
+                        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data) if chunked else data)
+                        sent += len(data)
+                    if chunked:
+                        self.wfile.write(b"0\r\n\r\n")
+                except (ConnectionError, TimeoutError):
+                    self.close_connection = True  # client went away; stop producing
+                except Exception as e:
+                    # headers are out, so no 500 is possible: log and cut the stream short
+                    app._server_error(e)
+                    self.close_connection = True
+                finally:
+                    chunks.close()
+                return status, sent
 
             def do_OPTIONS(self):
                 self.send_response(204)
-                self.send_header("Access-Control-Allow-Origin", allow_origin)
-                self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
-                self.send_header("Access-Control-Allow-Methods", "GET,POST,PATCH,DELETE,OPTIONS")
+                for k, v in cors.items():
+                    self.send_header(k, v)
                 self.end_headers()
 
+            def log_request(self, code="-", size="-"):
+                pass  # App._record_request() logs every request off the request thread
+
+            def log_message(self, format, *args):
+                app.access_log.error(f"{self.address_string()} {format % args}")
+
             def _dispatch(self, method):
-                methods, path_params, parsed = app._match_route(self.path)
-                if not methods:
-                    self._send_json({"error": "Route not found"}, status=404)
+                started = time.perf_counter()
+                parsed = urlparse(self.path)
+                too_large = app._body_too_large(self.body_pending)
+                if too_large:
+                    # the body stays unread, so end_headers() also closes the connection
+                    status, nbytes = self._send_json(too_large, status=413)
+                    app._record_request(method, None, parsed.path, status, started, nbytes, self.client_address[0])
                     return
-                handler = methods.get(method)
-                if not handler:
-                    self._send_json({"error": f"Method {method} not allowed"}, status=405)
+                handler, path_params, route, allowed = app.router.lookup(method, parsed.path)
+                if handler is None:
+                    if allowed is None:
+                        status, nbytes = self._send_json({"error": "Route not found"}, status=404)
+                    else:
+                        status, nbytes = self._send_json({"error": f"Method {method} not allowed"}, status=405,
+                                                         headers={"Allow": ", ".join(allowed)})
+                    app._record_request(method, route.pattern if route else None, parsed.path, status, started,
+                                        nbytes, self.client_address[0])
                     return
 
-                query = {k: (v[0] if len(v)==1 else v) for k, v in parse_qs(parsed.query).items()}
-                request = {
-                    "method": method,
-                    "path": parsed.path,
-                    "headers": dict(self.headers.items()),
-                    "query": query,
-                    "params": path_params or {},
-                    "json": self._read_json() if method in {"POST","PATCH","DELETE"} else None,
-                    "ip": self.client_address[0],   # ← for rate-limiting
-                }
-
-                wrapped = app._apply_middlewares(handler)
+                request = app._build_request(method, parsed, self.headers, path_params,
+                                             self.read_body, self.client_address[0])
+
+                wrapped = app._chain(route.pattern, method, handler)
+                profiler = app.profiler
                 try:
-                    result = wrapped(request)
+                    if profiler is not None and profiler.wants(request):
+                        result = profiler.run(route.pattern, method, _call_chain, wrapped, request)
+                    else:
+                        result = _call_chain(wrapped, request)
                 except Exception as e:
-                    import traceback
-                    print("=== SERVER ERROR ===")
-                    print(traceback.format_exc())
-                    self._send_json({"error": "Internal Server Error", "detail": str(e)}, status=500)
-                    return
+                    result = app._server_error(e)
+                if self.body_pending:
+                    self.read_body()  # unread (size-checked) body: skip it so the connection stays reusable
 
-                if isinstance(result, tuple) and len(result) == 2:
-                    body, status = result
+                body, status, headers = app._split_result(result)
+                if is_stream(body):
+                    status, nbytes = self._send_stream(body, status, headers)
                 else:
-                    body, status = result, 200
-                self._send_json(body, status=status)
+                    status, nbytes = self._send_json(body, status=status, headers=headers)
+                app._record_request(method, route.pattern, parsed.path, status, started, nbytes,
+                                    self.client_address[0], request)
 
             def do_GET(self):     self._dispatch("GET")
             def do_POST(self):    self._dispatch("POST")
             def do_PATCH(self):   self._dispatch("PATCH")
             def do_DELETE(self):  self._dispatch("DELETE")
 
-        print(f"✅ Server running at http://{host}:{port}")
-        server = HTTPServer((host, port), Handler)
-        server.serve_forever()
+        return Handler
+
+    def run_async(self, host="127.0.0.1", port=5000, allow_origin="*", threads=8, backlog=128,
+                  keepalive_timeout=5, keepalive_max_requests=100):
+        """
+        Single-process asyncio engine. `async def` handlers and middleware run on the loop;
+        plain handlers run in a pool of `threads` executor threads. Same request/response
+        contract as run().
+        """
+        self.freeze("async")
+        self.startup()
+        print(f"✅ Server running at http://{host}:{port} (async)")
+        try:
+            asyncio.run(serve_async(self, host, port, cors_headers(allow_origin), threads=threads,
+                                    backlog=backlog, keepalive_timeout=keepalive_timeout,
+                                    keepalive_max_requests=keepalive_max_requests))
+        finally:
+            self.shutdown()
+
+
+def _call_hook(fn):
+    result = fn()
+    if inspect.isawaitable(result):
+        asyncio.run(maybe_await(result))  # hooks run outside the server's event loop
+
+
+def _call_chain(chain, request):
+    result = chain(request)
+    if inspect.isawaitable(result):
+        # an async handler under a threaded engine gets a private event loop
+        result = asyncio.run(maybe_await(result))
+    return result
+
+
+def _drain_async_iterable(aiterable):
+    """Iterate an async iterable from sync code (threaded engine) on a private event loop."""
+    loop = asyncio.new_event_loop()
+    iterator = aiterable.__aiter__()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            loop.run_until_complete(aclose())
+        loop.close()
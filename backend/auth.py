@@ -1,30 +1,157 @@
-import os, time, bcrypt, jwt
+import os, time, hashlib, threading, bcrypt, jwt
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+from . import metrics
+from .config import THREADS
+
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
 JWT_ALG = "HS256"
 JWT_TTL_SECONDS = 60 * 60 * 24  # 24 hours
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "10000"))  # 0 disables the verified-token cache
 
-def hash_password(password: str) -> bytes:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+# ---------- password hashing pool ----------
+# bcrypt releases the GIL, so a small thread pool hashes in parallel. The request thread
+# waits for its hash, so every admitted job also holds one of the server's THREADS:
+# admission is capped at THREADS - 1, leaving a thread for /health and everything else.
+# Jobs beyond BCRYPT_MAX_JOBS are refused with PasswordPoolBusy (-> 503 + Retry-After).
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(os.cpu_count() or 2, max(1, THREADS - 1)))))
+BCRYPT_QUEUE = int(os.getenv("BCRYPT_QUEUE", str(max(0, THREADS - 1 - BCRYPT_WORKERS))))
+BCRYPT_MAX_JOBS = max(1, min(BCRYPT_WORKERS + BCRYPT_QUEUE, THREADS - 1))
 
-def check_password(password: str, hashed: bytes) -> bool:
+class PasswordPoolBusy(Exception):
+    retry_after = 1  # seconds
+
+_pw_pool = None
+_pw_pool_pid = None
+_pw_slots = threading.BoundedSemaphore(BCRYPT_MAX_JOBS)
+_pw_lock = threading.Lock()
+
+def _password_pool() -> ThreadPoolExecutor:
+    global _pw_pool, _pw_pool_pid
+    if _pw_pool is None or _pw_pool_pid != os.getpid():
+        with _pw_lock:
+            if _pw_pool is None or _pw_pool_pid != os.getpid():
+                # forked workers need their own threads
+                _pw_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+                _pw_pool_pid = os.getpid()
+    return _pw_pool
+
+def shutdown_password_pool():
+    """Stop the hashing threads, e.g. before fork(); the next hash starts a new pool."""
+    global _pw_pool, _pw_pool_pid
+    with _pw_lock:
+        pool, pid = _pw_pool, _pw_pool_pid
+        _pw_pool = _pw_pool_pid = None
+    if pool is not None and pid == os.getpid():
+        pool.shutdown(wait=True)
+
+def _run_in_pool(fn, *args):
+    if not _pw_slots.acquire(blocking=False):
+        raise PasswordPoolBusy()
+    try:
+        future = _password_pool().submit(fn, *args)
+    except BaseException:
+        _pw_slots.release()
+        raise
+    future.add_done_callback(lambda _f: _pw_slots.release())
+    return future.result()
+
+def _checkpw(password: bytes, hashed: bytes) -> bool:
     try:
-        return bcrypt.checkpw(password.encode(), hashed)
+        return bcrypt.checkpw(password, hashed)
     except Exception:
         return False
 
+def hash_password(password: str) -> bytes:
+    """Raises PasswordPoolBusy when the hashing queue is full."""
+    return _run_in_pool(bcrypt.hashpw, password.encode(), bcrypt.gensalt(BCRYPT_ROUNDS))
+
+def check_password(password: str, hashed: bytes) -> bool:
+    """Raises PasswordPoolBusy when the hashing queue is full."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode()
+    return _run_in_pool(_checkpw, password.encode(), hashed)
+
+def needs_rehash(hashed: bytes) -> bool:
+    """True when the hash was made with a different cost than BCRYPT_ROUNDS."""
+    if isinstance(hashed, str):
+        hashed = hashed.encode()
+    try:
+        return int(hashed.split(b"$")[2]) != BCRYPT_ROUNDS  # $2b$<cost>$<salt+hash>
+    except (IndexError, ValueError):
+        return True
+
 def create_token(user_id: int, email: str) -> str:
     now = int(time.time())
     payload = {"sub": user_id, "email": email, "iat": now, "exp": now + JWT_TTL_SECONDS}
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
 
-def verify_token(token: str) -> Optional[dict]:
+# ---------- verified-token cache ----------
+# sha256(token) -> (claims, exp). Only tokens that passed full verification get in, and a hit
+# is only honoured while exp is in the future, so cached and uncached answers always agree.
+# A tampered token has a different digest and goes through jwt.decode like any other miss.
+_token_cache: "OrderedDict[bytes, tuple]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+_token_cache_secret = JWT_SECRET
+_token_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+def _decode(token: str) -> Optional[dict]:
     try:
         return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+    except jwt.ExpiredSignatureError:
+        metrics.inc("pyreactx_auth_failures_total", (("reason", "expired_token"),))
+        return None
     except Exception:
+        metrics.inc("pyreactx_auth_failures_total", (("reason", "invalid_token"),))
         return None
 
+def verify_token(token: str) -> Optional[dict]:
+    global _token_cache_secret
+    if JWT_CACHE_SIZE <= 0:
+        return _decode(token)
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    with _token_cache_lock:
+        if _token_cache_secret != JWT_SECRET:
+            # secret rotated: nothing verified under the old one may be served
+            _token_cache.clear()
+            _token_cache_secret = JWT_SECRET
+        entry = _token_cache.get(key)
+        if entry is not None:
+            claims, exp = entry
+            if exp is None or now < exp:
+                _token_cache.move_to_end(key)
+                _token_cache_stats["hits"] += 1
+                return dict(claims)
+            del _token_cache[key]
+            _token_cache_stats["evictions"] += 1
+        _token_cache_stats["misses"] += 1
+        secret = JWT_SECRET
+
+    claims = _decode(token)
+    if claims is None:
+        return None
+    exp = claims.get("exp")
+    with _token_cache_lock:
+        if secret == _token_cache_secret:
+            _token_cache[key] = (dict(claims), float(exp) if exp is not None else None)
+            _token_cache.move_to_end(key)
+            while len(_token_cache) > JWT_CACHE_SIZE:
+                _token_cache.popitem(last=False)
+                _token_cache_stats["evictions"] += 1
+    return claims
+
+def token_cache_stats() -> dict:
+    with _token_cache_lock:
+        return {**_token_cache_stats, "size": len(_token_cache)}
+
+def clear_token_cache() -> None:
+    with _token_cache_lock:
+        _token_cache.clear()
+
 def parse_bearer(auth_header: str) -> Optional[str]:
     if not auth_header: return None
     parts = auth_header.split()
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics, simpledb
+
+# ---------- version stamps ----------
+# Every owner (e.g. a user id) has a version number; bumping it invalidates everything
+# cached for that owner. current(owner) -> int, bump(owner) -> None
+
+class MemoryVersions:
+    """Per-process counters: exact for one process, blind to writes made by other workers."""
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def current(self, owner):
+        return self._versions.get(owner, 0)
+
+    def bump(self, owner):
+        with self._lock:
+            self._versions[owner] = self._versions.get(owner, 0) + 1
+
+
+class SQLiteVersions:
+    """
+    Versions in a SQLite table that every worker reads, so a write in one process
+    invalidates the others' caches. Costs one primary-key lookup per cache read.
+    The table is created on first use, so constructing one touches no database.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self._ready = False
+
+    def _create_table(self):
+        simpledb.exec("""
+            CREATE TABLE IF NOT EXISTS cache_versions (
+              owner TEXT PRIMARY KEY,
+              version INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """, db_path=self.db_path)
+        self._ready = True
+
+    def current(self, owner):
+        if not self._ready:
+            self._create_table()
+        row = simpledb.query_one("SELECT version FROM cache_versions WHERE owner=?", (str(owner),), self.db_path)
+        return row["version"] if row else 0
+
+    def bump(self, owner):
+        if not self._ready:
+            self._create_table()
+        simpledb.exec("INSERT INTO cache_versions(owner, version) VALUES (?, 1) "
+                      "ON CONFLICT(owner) DO UPDATE SET version = version + 1", (str(owner),), self.db_path)
+
+
+def make_versions(kind="memory", db_path=None):
+    if kind == "sqlite":
+        return SQLiteVersions(db_path)
+    if kind == "memory":
+        return MemoryVersions()
+    raise ValueError(f"unknown cache version store {kind!r}")
+
+
+# ---------- cache ----------
+
+class OwnerCache:
+    """
+    Read-through cache of JSON-able values per owner, e.g. a user's todo pages:
+
+        body = cache.get_or_load(user_id, ("page", 1, 10), lambda: load_page(...))
+        ...
+        cache.invalidate(user_id)   # after any write to that user's data
+
+    Entries are evicted least recently used first once their estimated size passes
+    max_bytes. Values are shared between requests: treat them as read-only.
+    ttl (seconds) bounds staleness when versions can't see every writer (MemoryVersions
+    with several workers).
+    """
+
+    def __init__(self, name, versions=None, max_bytes=8 * 1024 * 1024, ttl=None):
+        self.name = name
+        self.versions = versions if versions is not None else MemoryVersions()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries = OrderedDict()  # (owner, key) -> (version, expires, value, size)
+        self._owners = {}              # owner -> {key}, for precise invalidation
+        self._lock = threading.Lock()
+        self._hit = (("cache", name), ("result", "hit"))
+        self._miss = (("cache", name), ("result", "miss"))
+
+    def get_or_load(self, owner, key, loader):
+        version = self.versions.current(owner)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((owner, key))
+            if entry is not None:
+                if entry[0] == version and (entry[1] is None or entry[1] > now):
+                    self._entries.move_to_end((owner, key))
+                    metrics.inc("pyreactx_cache_requests_total", self._hit)
+                    return entry[2]
+                self._remove(owner, key)
+        metrics.inc("pyreactx_cache_requests_total", self._miss)
+        value = loader()
+        self._store(owner, key, version, value, now)
+        return value
+
+    def _store(self, owner, key, version, value, now):
+        size = len(json.dumps(value, separators=(",", ":"), default=str)) + 100  # + rough per-entry overhead
+        if size > self.max_bytes:
+            return
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            if (owner, key) in self._entries:
+                self._remove(owner, key)
+            self._entries[(owner, key)] = (version, expires, value, size)
+            self._owners.setdefault(owner, set()).add(key)
+            self.size += size
+            while self.size > self.max_bytes:
+                (old_owner, old_key), _entry = next(iter(self._entries.items()))
+                self._remove(old_owner, old_key)
+
+    def _remove(self, owner, key):
+        entry = self._entries.pop((owner, key))
+        self.size -= entry[3]
+        keys = self._owners.get(owner)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._owners[owner]
+
+    def invalidate(self, owner):
+        """
+        New version for owner: nothing cached before this call is served again. Call it after
+        the write has committed; bumping earlier lets a concurrent reader cache the old rows
+        under the new version.
+        """
+        self.versions.bump(owner)
+        with self._lock:
+            for key in list(self._owners.get(owner, ())):
+                self._remove(owner, key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._owners.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
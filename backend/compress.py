@@ -0,0 +1,63 @@
+import gzip
+import re
+
+# Optional brotli support if the brotli package is installed.
+try:
+    import brotli  # type: ignore
+except Exception:
+    brotli = None
+
+ENCODERS = {"gzip": lambda data: gzip.compress(data, compresslevel=6)}
+if brotli is not None:
+    ENCODERS["br"] = lambda data: brotli.compress(data, quality=5)
+
+PREFERENCE = ("br", "gzip")  # when the client likes several equally
+COMPRESSIBLE = ("application/json", "text/", "application/javascript", "application/x-ndjson")
+
+_VARIANT = re.compile(r'-(?:%s)"$' % "|".join(PREFERENCE))
+
+
+def compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE)
+
+
+def negotiate(accept_encoding):
+    """Best encoding we support from an Accept-Encoding header, or None for identity."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for name in PREFERENCE:
+        if name not in ENCODERS:
+            continue
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def variant_etag(etag, encoding):
+    """Each encoding of a body is a different representation, so it gets its own strong ETag."""
+    return etag[:-1] + "-" + encoding + '"'
+
+
+def base_etag(etag):
+    return _VARIANT.sub('"', etag)
+
+
+def add_vary(headers, value="Accept-Encoding"):
+    vary = headers.get("Vary")
+    if not vary:
+        headers["Vary"] = value
+    elif value.lower() not in vary.lower():
+        headers["Vary"] = vary + ", " + value
@@ -12,3 +12,54 @@ HOST = os.getenv("HOST", "127.0.0.1")
 CORS_ALLOW_ORIGIN = os.getenv("CORS_ALLOW_ORIGIN", "*")
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-me")
 RATE_LIMIT_PER_MIN = int(os.getenv("RATE_LIMIT_PER_MIN", "60"))
+
+# Serving engine: single | threaded | prefork | async
+SERVER_MODE = os.getenv("SERVER_MODE", "threaded")
+WORKERS = int(os.getenv("WORKERS", str(os.cpu_count() or 1)))
+THREADS = int(os.getenv("THREADS", "8"))
+BACKLOG = int(os.getenv("BACKLOG", "128"))
+KEEPALIVE_TIMEOUT = float(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+KEEPALIVE_MAX_REQUESTS = int(os.getenv("KEEPALIVE_MAX_REQUESTS", "100"))
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", str(1024 * 1024)))  # bigger bodies get 413
+
+# Access log: "-" = stdout, a file path, or "off"
+ACCESS_LOG = os.getenv("ACCESS_LOG", "-")
+ACCESS_LOG_FORMAT = os.getenv("ACCESS_LOG_FORMAT", "json")  # json | text
+ACCESS_LOG_SAMPLE = float(os.getenv("ACCESS_LOG_SAMPLE", "1.0"))  # 5xx are always logged
+ACCESS_LOG_QUEUE = int(os.getenv("ACCESS_LOG_QUEUE", "10000"))  # records beyond this are dropped
+
+# Metrics (Prometheus text on /metrics). The endpoint is only served when METRICS_TOKEN is set,
+# and then only to requests carrying "Authorization: Bearer <METRICS_TOKEN>".
+# Numbers are per process: in prefork mode a scrape reaches whichever worker accepts it and
+# sees that worker's counters only, labelled pid="..."; sum over pid in queries.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no", "off")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Request profiling: off | sample | cprofile. Profiled: requests with PROFILE_HEADER set to
+# PROFILE_TOKEN, plus a PROFILE_SAMPLE fraction of all requests. Output goes to PROFILE_DIR.
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "X-Profile")
+PROFILE_SAMPLE = float(os.getenv("PROFILE_SAMPLE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+
+# SQLite
+DB_PATH = os.getenv("DB_PATH", "pyreactx.db")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-16000"))  # negative = KiB
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+
+# Rate limiting: memory (per process) | sqlite (shared by all workers in RATE_LIMIT_DB)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sqlite" if SERVER_MODE == "prefork" else "memory")
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", "ratelimit.db")
+LOGIN_RATE_LIMIT_PER_MIN = int(os.getenv("LOGIN_RATE_LIMIT_PER_MIN", "10"))
+
+# Per-user GET /todos cache (example app): 0 bytes disables it.
+# Versions: memory (per process) | sqlite (in DB_PATH, seen by every prefork worker)
+TODO_CACHE_BYTES = int(os.getenv("TODO_CACHE_BYTES", str(8 * 1024 * 1024)))
+TODO_CACHE_VERSIONS = os.getenv("TODO_CACHE_VERSIONS", "sqlite" if SERVER_MODE == "prefork" else "memory")
+TODO_CACHE_TTL = float(os.getenv("TODO_CACHE_TTL", "0"))  # seconds; bounds staleness if versions are per process
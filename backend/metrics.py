@@ -0,0 +1,142 @@
+import bisect
+import os
+import threading
+
+from .config import METRICS_ENABLED
+
+# Seconds. Covers a cached GET (~100µs) up to a slow bcrypt login or a big export.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registry:
+    """
+    Counters and histograms aggregated per thread: each thread only ever writes its own
+    shard, so recording takes no lock. collect() merges the shards when /metrics is read.
+    Numbers are per process: a forked (prefork) worker reports only its own and labels
+    every series with pid="<its pid>", so scrapes landing on different workers show up as
+    separate series instead of one counter that keeps jumping back. Sum them in queries.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.enabled = METRICS_ENABLED
+        self.help = {}       # metric name -> (type, help text)
+        self.collectors = []  # () -> [(name, type, help, [(labels, value)])], read at render time
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self.const_labels = ()  # added to every series
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # forked worker: start from zero rather than report the parent's numbers
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+        self.const_labels = (("pid", str(os.getpid())),)
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = ({}, {})  # (counters, histograms)
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def inc(self, name, labels=(), value=1):
+        """labels: tuple of (key, value) pairs, in a fixed order per metric"""
+        if not self.enabled:
+            return
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        if not self.enabled:
+            return
+        histograms = self._shard()[1]
+        key = (name, labels)
+        h = histograms.get(key)
+        if h is None:
+            h = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]  # bucket counts..., +Inf, sum
+        h[bisect.bisect_left(self.buckets, value)] += 1
+        h[-1] += value
+
+    def collect(self):
+        """-> (counters, histograms) summed over every thread"""
+        with self._lock:
+            shards = list(self._shards)
+        counters, histograms = {}, {}
+        for shard_counters, shard_histograms in shards:
+            for key, value in shard_counters.copy().items():
+                counters[key] = counters.get(key, 0) + value
+            for key, h in shard_histograms.copy().items():
+                total = histograms.get(key)
+                if total is None:
+                    histograms[key] = list(h)
+                else:
+                    for i, v in enumerate(h):
+                        total[i] += v
+        return counters, histograms
+
+    def reset(self):
+        with self._lock:
+            for counters, histograms in self._shards:
+                counters.clear()
+                histograms.clear()
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)."""
+        counters, histograms = self.collect()
+        const = self.const_labels
+        families = {}
+        for (name, labels), value in counters.items():
+            families.setdefault(name, []).append(_line(name, const + labels, value))
+        for (name, labels), h in histograms.items():
+            labels = const + labels
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), h):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(_line(name + "_bucket", labels + (("le", le),), cumulative))
+            lines.append(_line(name + "_sum", labels, h[-1]))
+            lines.append(_line(name + "_count", labels, cumulative))
+        for collector in self.collectors:
+            for name, kind, text, samples in collector():
+                self.help.setdefault(name, (kind, text))
+                families.setdefault(name, []).extend(_line(name, const + labels, v) for labels, v in samples)
+        out = []
+        for name in sorted(families):
+            kind, text = self.help.get(name, ("untyped", ""))
+            if text:
+                out.append(f"# HELP {name} {text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(families[name])
+        return "\n".join(out) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _line(name, labels, value):
+    if labels:
+        name += "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+    return f"{name} {value}"
+
+
+REGISTRY = Registry()
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+
+REGISTRY.describe("pyreactx_http_requests_total", "counter", "HTTP requests by route, method and status")
+REGISTRY.describe("pyreactx_http_request_duration_seconds", "histogram", "HTTP request latency by route and method")
+REGISTRY.describe("pyreactx_db_query_duration_seconds", "histogram", "SQLite statement time by statement")
+REGISTRY.describe("pyreactx_db_query_errors_total", "counter", "SQLite statements that raised")
+REGISTRY.describe("pyreactx_rate_limit_rejections_total", "counter", "Requests refused with 429 by scope")
+REGISTRY.describe("pyreactx_auth_failures_total", "counter", "Failed authentications by reason")
+REGISTRY.describe("pyreactx_cache_requests_total", "counter", "Cache lookups by cache and result")
@@ -0,0 +1,50 @@
+import time
+
+from . import simpledb
+
+# A migration is (version, name, step): version an int that only ever grows, step one SQL
+# statement, a list of them, or a callable(conn) for anything else. Applied versions are
+# recorded in schema_migrations, so each step runs once per database.
+
+_TABLE = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+  version INTEGER PRIMARY KEY,
+  name TEXT NOT NULL,
+  applied_at REAL NOT NULL
+)
+"""
+
+
+def applied(db_path=None):
+    """-> set of versions already applied to db_path"""
+    simpledb.exec(_TABLE, db_path=db_path)
+    return {r["version"] for r in simpledb.query_all("SELECT version FROM schema_migrations", db_path=db_path)}
+
+
+def migrate(migrations, db_path=None):
+    """
+    Apply the migrations db_path hasn't seen yet, in version order, each in its own
+    transaction together with its schema_migrations row. -> list of versions applied
+    (empty when the schema is current: that costs one read).
+    """
+    versions = [m[0] for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError("duplicate migration versions")
+    done = applied(db_path)
+    ran = []
+    for version, name, step in sorted(migrations, key=lambda m: m[0]):
+        if version in done:
+            continue
+        with simpledb.transaction(db_path) as conn:
+            # another process may have applied it since we looked; BEGIN IMMEDIATE serializes us
+            if conn.execute("SELECT 1 FROM schema_migrations WHERE version=?", (version,)).fetchone():
+                continue
+            if callable(step):
+                step(conn)
+            else:
+                for sql in ([step] if isinstance(step, str) else step):
+                    conn.execute(sql)
+            conn.execute("INSERT INTO schema_migrations(version, name, applied_at) VALUES (?,?,?)",
+                         (version, name, time.time()))
+        ran.append(version)
+    return ran
@@ -0,0 +1,141 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from . import simpledb
+
+KINDS = ("cprofile", "sample")
+
+
+class Profiler:
+    """
+    Profiles single requests on demand, for the blocking engines (single/threaded/prefork).
+    A request is profiled when it carries `header` with the admin `token`, or by chance
+    with probability `sample`. One request per process is profiled at a time; others that
+    ask meanwhile simply run unprofiled.
+
+      kind="sample":   the request thread's stack is sampled every `interval` seconds and
+                       appended per route to <output_dir>/<METHOD_route>.folded (collapsed
+                       stacks for flamegraph.pl / speedscope); a running simpledb statement
+                       shows up as a final "SQL ..." frame
+      kind="cprofile": one <METHOD_route>-<ms>-<pid>.prof per request (pstats / snakeviz)
+
+    Either way <METHOD_route>.sql.jsonl gets a line per profiled request listing its SQL
+    statements and their durations.
+    """
+
+    def __init__(self, kind="sample", output_dir="profiles", token=None, header="X-Profile",
+                 sample=0.0, interval=0.002):
+        if kind not in KINDS:
+            raise ValueError(f"unknown profiler kind {kind!r}")
+        self.kind = kind
+        self.output_dir = output_dir
+        self.token = token.encode() if token else None
+        self.header = header
+        self.sample = sample
+        self.interval = interval
+        self.profiled = 0
+        self._busy = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+    def wants(self, request):
+        if self.token is not None:
+            given = request.header(self.header)
+            if given is not None:
+                return hmac.compare_digest(given.encode(), self.token)
+        return self.sample > 0.0 and random.random() < self.sample
+
+    def run(self, pattern, method, fn, *args):
+        """fn(*args) under the profiler; runs it unprofiled when another request is being profiled."""
+        if not self._busy.acquire(blocking=False):
+            return fn(*args)
+        try:
+            self.profiled += 1
+            name = re.sub(r"[^A-Za-z0-9]+", "_", f"{method} {pattern}").strip("_")
+            started = time.perf_counter()
+            with simpledb.trace_statements() as statements:
+                if self.kind == "cprofile":
+                    return self._cprofile(name, started, statements, fn, args)
+                return self._sample(f"{method} {pattern}", name, started, statements, fn, args)
+        finally:
+            self._busy.release()
+
+    def _cprofile(self, name, started, statements, fn, args):
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args)
+        finally:
+            path = os.path.join(self.output_dir, f"{name}-{int(time.time() * 1000)}-{os.getpid()}.prof")
+            self._write(lambda: profile.dump_stats(path))
+            self._write_statements(name, started, statements, os.path.basename(path))
+
+    def _sample(self, root, name, started, statements, fn, args):
+        stacks = Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(target=self._sampler, args=(threading.get_ident(), stop, stacks),
+                                   name="profiler", daemon=True)
+        sampler.start()
+        try:
+            return fn(*args)
+        finally:
+            stop.set()
+            sampler.join()
+            lines = "".join(f"{root};{';'.join(stack)} {count}\n" for stack, count in stacks.items())
+            self._write(lambda: _append(os.path.join(self.output_dir, name + ".folded"), lines))
+            self._write_statements(name, started, statements)
+
+    def _sampler(self, ident, stop, stacks):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(ident)
+            stack = []
+            while frame is not None and frame.f_code is not _SAMPLE_CODE:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if not stack:
+                continue
+            stack.reverse()
+            sql = simpledb.running_statement(ident)
+            if sql is not None:
+                stack.append("SQL " + sql.replace(";", ","))
+            stacks[tuple(stack)] += 1
+
+    def _write_statements(self, name, started, statements, profile=None):
+        record = {"ts": round(time.time(), 3), "ms": round((time.perf_counter() - started) * 1000.0, 3),
+                  "statements": [[sql, round(seconds * 1000.0, 3)] for sql, seconds in statements]}
+        if profile is not None:
+            record["profile"] = profile
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._write(lambda: _append(os.path.join(self.output_dir, name + ".sql.jsonl"), line))
+
+    @staticmethod
+    def _write(write):
+        # a full disk must not turn the profiled request into a 500
+        try:
+            write()
+        except OSError as e:
+            sys.stderr.write(f"profiler: {e}\n")
+
+
+_SAMPLE_CODE = Profiler._sample.__code__  # stacks are cut here: the server plumbing above is noise
+
+_frame_names = {}  # code -> "func (file.py:line)"
+
+def _frame_name(code):
+    name = _frame_names.get(code)
+    if name is None:
+        name = f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        name = _frame_names[code] = name.replace(";", ",")
+    return name
+
+
+def _append(path, text):
+    # one O_APPEND write per request keeps lines from prefork workers whole
+    with open(path, "a") as f:
+        f.write(text)
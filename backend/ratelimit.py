@@ -0,0 +1,196 @@
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from . import metrics, simpledb
+from .aio import maybe_await
+
+# ---------- algorithms ----------
+# Each keeps a fixed 3-number state per key, so memory is O(1) per client whatever the limit.
+# step(state, now) -> (allowed, new_state, retry_after_seconds)
+
+class TokenBucket:
+    """`rate` tokens/second refill a bucket of `burst`; each request takes one."""
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.idle_after = self.burst / self.rate  # a full bucket is the same as no state
+
+    def initial(self, now):
+        return (self.burst, now, 0.0)
+
+    def step(self, state, now):
+        tokens, last, _ = state
+        tokens = min(self.burst, tokens + max(now - last, 0.0) * self.rate)
+        if tokens >= 1.0:
+            return True, (tokens - 1.0, now, 0.0), 0.0
+        return False, (tokens, now, 0.0), (1.0 - tokens) / self.rate
+
+
+class SlidingWindowCounter:
+    """
+    At most `limit` requests per `window` seconds, estimated from this window's count plus
+    the previous window's count weighted by how much of it still overlaps.
+    """
+
+    def __init__(self, limit, window=60.0):
+        self.limit = int(limit)
+        self.window = float(window)
+        self.idle_after = 2 * self.window
+
+    def initial(self, now):
+        return (now - now % self.window, 0.0, 0.0)
+
+    def step(self, state, now):
+        start, current, previous = state
+        window_start = now - now % self.window
+        if window_start != start:
+            previous = current if window_start - start == self.window else 0.0
+            current, start = 0.0, window_start
+        elapsed = (now - start) / self.window
+        if previous * (1.0 - elapsed) + current + 1 <= self.limit:
+            return True, (start, current + 1, previous), 0.0
+        if current + 1 > self.limit or not previous:
+            retry = start + self.window - now
+        else:
+            # when the previous window's weight has decayed enough to fit one more
+            retry = start + self.window * (1.0 - (self.limit - current - 1) / previous) - now
+        return False, (start, current, previous), max(retry, 0.0)
+
+
+# ---------- backends ----------
+
+class MemoryBackend:
+    """Per-process state; least recently seen keys go first once idle or over max_keys."""
+    blocking = False
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._states = OrderedDict()  # key -> (state, expires)
+        self._lock = threading.Lock()
+
+    def hit(self, key, algorithm, now):
+        with self._lock:
+            entry = self._states.pop(key, None)
+            state = entry[0] if entry is not None and entry[1] > now else algorithm.initial(now)
+            allowed, state, retry = algorithm.step(state, now)
+            self._states[key] = (state, now + algorithm.idle_after)
+            self._evict(now)
+        return allowed, retry
+
+    def _evict(self, now):
+        states = self._states
+        while states:
+            key, (_state, expires) = next(iter(states.items()))
+            if expires > now and len(states) <= self.max_keys:
+                break
+            del states[key]
+
+    def __len__(self):
+        return len(self._states)
+
+
+class SQLiteBackend:
+    """State in a SQLite file, so every worker process draws from one budget (table created on first use)."""
+    blocking = True  # BEGIN IMMEDIATE may wait out the busy timeout: keep it off the event loop
+
+    def __init__(self, db_path="ratelimit.db", sweep_every=1000):
+        self.db_path = db_path
+        self.sweep_every = sweep_every
+        self._hits = 0
+        self._ready = False
+
+    def _create_table(self):
+        simpledb.exec("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+              key TEXT PRIMARY KEY,
+              a REAL NOT NULL, b REAL NOT NULL, c REAL NOT NULL,
+              expires REAL NOT NULL
+            ) WITHOUT ROWID
+        """, db_path=self.db_path)
+        self._ready = True
+
+    def hit(self, key, algorithm, now):
+        if not self._ready:
+            self._create_table()
+        with simpledb.transaction(self.db_path) as c:
+            row = c.execute("SELECT a, b, c, expires FROM rate_limits WHERE key=?", (key,)).fetchone()
+            state = (row[0], row[1], row[2]) if row and row[3] > now else algorithm.initial(now)
+            allowed, state, retry = algorithm.step(state, now)
+            c.execute(
+                "INSERT INTO rate_limits(key, a, b, c, expires) VALUES (?,?,?,?,?) "
+                "ON CONFLICT(key) DO UPDATE SET a=excluded.a, b=excluded.b, c=excluded.c, expires=excluded.expires",
+                (key, *state, now + algorithm.idle_after),
+            )
+            self._hits += 1
+            if self._hits % self.sweep_every == 0:
+                c.execute("DELETE FROM rate_limits WHERE expires <= ?", (now,))
+        return allowed, retry
+
+
+class RateLimiter:
+    def __init__(self, algorithm, backend=None):
+        self.algorithm = algorithm
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.rejected = 0
+
+    def hit(self, key):
+        """-> (allowed, retry_after_seconds)"""
+        allowed, retry = self.backend.hit(key, self.algorithm, time.time())
+        if not allowed:
+            self.rejected += 1
+        return allowed, retry
+
+
+def make_backend(kind="memory", db_path="ratelimit.db"):
+    if kind == "sqlite":
+        return SQLiteBackend(db_path)
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"unknown rate limit backend {kind!r}")
+
+
+# ---------- middleware ----------
+
+def rate_limit(limiter, scope="global", key=None, error=None):
+    """
+    Middleware factory. Pass it to app.use() for a global limit or to
+    route(..., middlewares=[...]) for a per-route one; `scope` keeps budgets apart.
+    Under run_async() a blocking backend (SQLite) is consulted on an executor thread.
+    """
+    key = key or (lambda request: request.get("ip", "local"))
+    error = error or {"error": "rate limit exceeded"}
+    blocking = getattr(limiter.backend, "blocking", False)
+
+    def rejected(retry):
+        metrics.inc("pyreactx_rate_limit_rejections_total", (("scope", scope),))
+        return (error, 429, {"Retry-After": str(max(1, math.ceil(retry)))})
+
+    def middleware(next_handler):
+        async def wrapped_async(request, bucket):
+            allowed, retry = await asyncio.get_running_loop().run_in_executor(None, limiter.hit, bucket)
+            if not allowed:
+                return rejected(retry)
+            return await maybe_await(next_handler(request))
+
+        def wrapped(request):
+            bucket = f"{scope}:{key(request)}"
+            if blocking and _on_event_loop():
+                return wrapped_async(request, bucket)
+            allowed, retry = limiter.hit(bucket)
+            if not allowed:
+                return rejected(retry)
+            return next_handler(request)
+        return wrapped
+    return middleware
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
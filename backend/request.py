@@ -0,0 +1,132 @@
+import json
+from collections.abc import MutableMapping
+from urllib.parse import parse_qs
+
+BODY_METHODS = {"POST", "PATCH", "DELETE"}
+
+_UNSET = object()
+
+
+class Request(MutableMapping):
+    """
+    What handlers and middleware receive. Headers, query and JSON body are only parsed
+    when first read, and the body is only read off the socket if someone asks for it.
+    Still behaves like the old request dict: request["json"], request.get("user"),
+    request["user"] = {...}, "user" in request, dict(request).
+    """
+    __slots__ = ("method", "path", "params", "ip", "query_string",
+                 "_raw_headers", "_headers", "_query", "_read_body", "_body", "_json", "_extra")
+
+    FIELDS = ("method", "path", "headers", "query", "params", "json", "ip")
+
+    def __init__(self, method, path, raw_headers, query_string="", params=None, read_body=None, ip=""):
+        self.method = method
+        self.path = path
+        self.params = params or {}
+        self.ip = ip
+        self.query_string = query_string
+        self._raw_headers = raw_headers  # http.client.HTTPMessage (case-insensitive .get)
+        self._headers = None
+        self._query = None
+        self._read_body = read_body
+        self._body = _UNSET
+        self._json = _UNSET
+        self._extra = None  # keys set by middleware, e.g. "user"
+
+    # ---------- lazy parts ----------
+
+    def header(self, name, default=None):
+        """Case-insensitive header lookup without copying the headers."""
+        if self._headers is not None:
+            value = self._headers.get(name)
+            if value is not None:
+                return value
+        value = self._raw_headers.get(name) if self._raw_headers is not None else None
+        return default if value is None else value
+
+    @property
+    def headers(self):
+        if self._headers is None:
+            self._headers = dict(self._raw_headers.items()) if self._raw_headers is not None else {}
+        return self._headers
+
+    @headers.setter
+    def headers(self, value):
+        self._headers = value
+
+    @property
+    def query(self):
+        if self._query is None:
+            qs = self.query_string
+            self._query = {k: (v[0] if len(v) == 1 else v) for k, v in parse_qs(qs).items()} if qs else {}
+        return self._query
+
+    @query.setter
+    def query(self, value):
+        self._query = value
+
+    @property
+    def body(self):
+        """Raw body bytes (b"" when there is none)."""
+        if self._body is _UNSET:
+            self._body = self._read_body() if self._read_body is not None else b""
+        return self._body
+
+    @property
+    def json(self):
+        """Decoded JSON body of POST/PATCH/DELETE, None if absent or invalid."""
+        if self._json is _UNSET:
+            self._json = None
+            if self.method in BODY_METHODS:
+                raw = self.body
+                if raw:
+                    try:
+                        self._json = json.loads(raw)
+                    except ValueError:
+                        pass
+        return self._json
+
+    @json.setter
+    def json(self, value):
+        self._json = value
+
+    # ---------- dict compatibility ----------
+
+    def __getitem__(self, key):
+        if key in Request.FIELDS:
+            return getattr(self, key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in Request.FIELDS:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in Request.FIELDS or self._extra is None:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def __contains__(self, key):
+        return key in Request.FIELDS or (self._extra is not None and key in self._extra)
+
+    def get(self, key, default=None):
+        if key in Request.FIELDS:
+            return getattr(self, key)
+        return self._extra.get(key, default) if self._extra is not None else default
+
+    def __iter__(self):
+        yield from Request.FIELDS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(Request.FIELDS) + (len(self._extra) if self._extra else 0)
+
+    def __repr__(self):
+        return f"<Request {self.method} {self.path}>"
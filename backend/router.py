@@ -0,0 +1,118 @@
+import re
+
+# `:name` or `:name<type>` path segments
+_PARAM = re.compile(r":([a-zA-Z_][a-zA-Z0-9_]*)(?:<([a-zA-Z_]+)>)?")
+
+
+def _to_int(seg):
+    # int() alone would also take " 5", "+5" and "1_000"
+    if not (seg.isascii() and seg.isdigit()):
+        raise ValueError(seg)
+    return int(seg)
+
+
+CONVERTERS = {
+    "str": str,
+    "int": _to_int,
+}
+
+
+class Route:
+    __slots__ = ("pattern", "methods")
+
+    def __init__(self, pattern, methods):
+        self.pattern = pattern
+        self.methods = methods  # the App.routes[pattern] dict itself, shared by reference
+
+
+class _Node:
+    __slots__ = ("children", "params", "route")
+
+    def __init__(self):
+        self.children = {}  # literal segment -> _Node
+        self.params = []    # [(name, type_name, converter, _Node)], tried in order
+        self.route = None
+
+
+class Router:
+    """
+    Routes compiled once at registration:
+      - patterns without params live in a dict keyed by the exact path
+      - patterns with `:params` live in a segment trie (literal children win over params)
+    """
+
+    def __init__(self):
+        self.static = {}
+        self.root = _Node()
+
+    def add(self, pattern, methods):
+        route = Route(pattern, methods)
+        if ":" not in pattern:
+            self.static[pattern] = route
+            return route
+        node = self.root
+        for seg in pattern.split("/")[1:]:
+            m = _PARAM.fullmatch(seg)
+            if not m:
+                node = node.children.setdefault(seg, _Node())
+                continue
+            name, type_name = m.group(1), m.group(2) or "str"
+            if type_name not in CONVERTERS:
+                raise ValueError(f"unknown converter <{type_name}> in route {pattern!r}")
+            for p_name, p_type, _conv, child in node.params:
+                if p_name == name and p_type == type_name:
+                    node = child
+                    break
+            else:
+                child = _Node()
+                node.params.append((name, type_name, CONVERTERS[type_name], child))
+                node = child
+        node.route = route
+        return route
+
+    def match(self, path):
+        """-> (Route, params) or (None, None)"""
+        route = self.static.get(path)
+        if route is not None:
+            return route, {}
+        params = {}
+        route = self._walk(self.root, path.split("/")[1:], 0, params)
+        if route is None:
+            return None, None
+        return route, params
+
+    def _walk(self, node, segs, i, params):
+        if i == len(segs):
+            return node.route
+        seg = segs[i]
+        child = node.children.get(seg)
+        if child is not None:
+            route = self._walk(child, segs, i + 1, params)
+            if route is not None:
+                return route
+        if not seg:
+            return None
+        for name, _type, conv, child in node.params:
+            try:
+                value = conv(seg)
+            except ValueError:
+                continue
+            route = self._walk(child, segs, i + 1, params)
+            if route is not None:
+                params[name] = value
+                return route
+        return None
+
+    def lookup(self, method, path):
+        """
+        -> (handler, params, route, allowed)
+           handler None and allowed None  => 404
+           handler None and allowed given => 405 (allowed = sorted method names)
+        """
+        route, params = self.match(path)
+        if route is None:
+            return None, None, None, None
+        handler = route.methods.get(method)
+        if handler is None:
+            return None, params, route, sorted(route.methods)
+        return handler, params, route, None
@@ -0,0 +1,336 @@
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+MODES = ("single", "threaded", "prefork")
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """
+    HTTP/1.1 persistent connections. Subclasses must send Content-Length on every
+    response except 204/304 (which have no body) and read request bodies through
+    read_body() so the stream stays framed.
+    """
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as separate writes; with Nagle on, the second one waits for
+    # the client's delayed ACK (~40ms) on every kept-alive request
+    disable_nagle_algorithm = True
+    timeout = 5          # seconds a kept-alive connection may sit idle
+    first_request_grace = 1.0  # seconds a new connection is safe from evict_idle()
+    max_requests = 100   # responses per connection before we ask the client to reconnect
+
+    def setup(self):
+        super().setup()
+        self.requests_served = 0
+        self.body_pending = 0
+        self._idle = False
+
+    def handle(self):
+        self.close_connection = True
+        # idle until the request line arrives, e.g. a browser's preconnect
+        self._set_idle(True, time.monotonic() + self.first_request_grace)
+        self.handle_one_request()
+        while not self.close_connection and not self.server_draining():
+            self._set_idle(True)
+            self.handle_one_request()
+
+    def finish(self):
+        self._set_idle(False)
+        super().finish()
+
+    def parse_request(self):
+        if not self._set_idle(False):
+            # closed by evict_idle()/drain() while this request arrived: part of it may be lost,
+            # so don't answer; the client sees EOF on a reused connection and retries
+            self.close_connection = True
+            return False
+        ok = super().parse_request()
+        if ok:
+            try:
+                self.body_pending = int(self.headers.get("Content-Length") or 0)
+                if self.body_pending < 0:
+                    raise ValueError
+            except ValueError:
+                self.body_pending = 0
+                self.send_error(400, "Bad Content-Length")  # also sends Connection: close
+                return False
+            if self.headers.get("Transfer-Encoding"):
+                # chunked request bodies aren't supported; don't try to reuse the stream
+                self.close_connection = True
+        return ok
+
+    def read_body(self):
+        length, self.body_pending = self.body_pending, 0
+        return self.rfile.read(length) if length > 0 else b""
+
+    def end_headers(self):
+        self.requests_served += 1
+        if (self.body_pending
+                or self.requests_served >= self.max_requests
+                or self.server_draining()
+                or not getattr(self.server, "keep_alive", True)):
+            self.send_header("Connection", "close")  # also sets self.close_connection
+        elif not self.close_connection:
+            if self.request_version == "HTTP/1.0":
+                self.send_header("Connection", "keep-alive")
+            self.send_header("Keep-Alive", f"timeout={int(self.timeout)}, max={self.max_requests}")
+        super().end_headers()
+
+    def server_draining(self):
+        return getattr(self.server, "draining", False)
+
+    def _set_idle(self, idle, evictable_after=0.0):
+        """-> False when the server closed this connection while it sat idle"""
+        conns = getattr(self.server, "idle_connections", None)
+        if conns is None:
+            return True
+        with self.server.idle_lock:
+            if idle:
+                conns[self.connection] = evictable_after  # insertion order: longest idle first
+                self._idle = True
+                return True
+            if not self._idle:
+                return True
+            self._idle = False
+            if self.connection in conns:
+                del conns[self.connection]
+                return True
+            return False
+
+
+def _close_idle(conn):
+    try:
+        conn.shutdown(socket.SHUT_RD)  # the handler's pending readline sees EOF
+    except OSError:
+        pass
+
+
+def drain(server):
+    """Stop reusing connections: busy ones close after their response, idle ones now."""
+    server.draining = True
+    with server.idle_lock:
+        for conn in list(server.idle_connections):
+            _close_idle(conn)
+        server.idle_connections.clear()
+
+
+def _readable(conn):
+    poller = select.poll()
+    poller.register(conn, select.POLLIN)
+    return bool(poller.poll(0))
+
+
+def evict_idle(server):
+    """
+    Close the longest-idle connection so its thread can serve someone else. Skips connections
+    whose next request is already arriving and new ones still in their first_request_grace.
+    -> whether one was closed
+    """
+    now = time.monotonic()
+    with server.idle_lock:
+        for conn, evictable_after in server.idle_connections.items():
+            if now >= evictable_after and not _readable(conn):
+                del server.idle_connections[conn]
+                break
+        else:
+            return False
+    _close_idle(conn)
+    return True
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTPServer that hands each accepted connection to a bounded thread pool."""
+
+    def __init__(self, server_address, handler_cls, threads=8, backlog=128, bind_and_activate=True):
+        self.request_queue_size = backlog
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="pyreactx-worker")
+        # one slot per worker: once every thread is busy the accept loop waits,
+        # so extra clients queue in the kernel backlog instead of in memory
+        self._slots = threading.BoundedSemaphore(threads)
+        super().__init__(server_address, handler_cls, bind_and_activate)
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            # every thread is taken: idle kept-alive clients give theirs up before a new one waits
+            evict_idle(self)
+            while not self._slots.acquire(timeout=0.05):
+                evict_idle(self)
+        try:
+            self._pool.submit(self._work, request, client_address)
+        except RuntimeError:  # pool already shut down
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def _work(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+
+
+def make_server(handler_cls, host, port, threads=1, backlog=128, sock=None):
+    """Build a single- or multi-threaded server, optionally on an inherited listening socket."""
+    if threads > 1:
+        server = PooledHTTPServer((host, port), handler_cls, threads=threads, backlog=backlog,
+                                  bind_and_activate=False)
+    else:
+        server = HTTPServer((host, port), handler_cls, bind_and_activate=False)
+        server.request_queue_size = backlog
+    if sock is None:
+        try:
+            server.server_bind()
+            server.server_activate()
+        except Exception:
+            server.server_close()
+            raise
+    else:
+        server.socket.close()
+        server.socket = sock
+        server.server_address = sock.getsockname()
+    # with a single thread an idle kept-alive client would block everybody else
+    server.keep_alive = threads > 1
+    server.draining = False
+    server.idle_connections = {}  # idle socket -> monotonic time it may be evicted from, oldest first
+    server.idle_lock = threading.Lock()
+    return server
+
+
+def _serve(server):
+    """serve_forever until SIGTERM/SIGINT, then let in-flight requests finish."""
+    def stop(signum, frame):
+        drain(server)
+        # shutdown() blocks until serve_forever returns, so it can't run on this thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+        # prefork workers start with SIGTERM blocked (see spawn()); one sent meanwhile lands here
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        drain(server)
+    finally:
+        server.server_close()
+
+
+def _listen(host, port, backlog):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+def serve_prefork(handler_cls, host, port, workers=2, threads=1, backlog=128, grace=10.0, on_exit=None):
+    """
+    Fork `workers` processes that accept on one inherited socket; respawn any that die.
+    on_exit() runs in each worker as it stops (workers leave through os._exit, skipping atexit).
+    """
+    sock = _listen(host, port, backlog)
+    children = {}  # pid -> spawn time
+    state = {"stopping": False, "deadline": None}
+
+    def spawn():
+        # a SIGTERM between fork() and the worker's own handler would run the master's stop()
+        # in the worker (or kill it before on_exit): hold it back until _serve() is ready for it
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM, signal.SIGINT})
+        try:
+            pid = os.fork()
+        except OSError:
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+            raise
+        if pid == 0:
+            # worker: the master owns Ctrl-C and tells us to stop with SIGTERM
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT})
+            code = 0
+            try:
+                _serve(make_server(handler_cls, host, port, threads=threads, backlog=backlog, sock=sock))
+            except Exception:
+                import traceback
+                traceback.print_exc()
+                code = 1
+            finally:
+                try:
+                    if on_exit is not None:
+                        on_exit()
+                finally:
+                    sys.stdout.flush()
+                    os._exit(code)
+        children[pid] = time.monotonic()
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+
+    def stop(signum, frame):
+        if state["stopping"]:
+            return
+        state["stopping"] = True
+        state["deadline"] = time.monotonic() + grace
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+
+    try:
+        while children:
+            # poll: a blocking waitpid is retried after signals (PEP 475), so once SIGTERM
+            # arrived the grace deadline below would never be checked
+            try:
+                pid, _status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if state["stopping"] and time.monotonic() > state["deadline"]:
+                    for child in list(children):
+                        try:
+                            os.kill(child, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                time.sleep(0.1)
+                continue
+            started = children.pop(pid, None)
+            if started is None or state["stopping"]:
+                continue
+            # back off if a worker crashes straight after starting
+            if time.monotonic() - started < 1.0:
+                time.sleep(1.0)
+            print(f"⚠️  worker {pid} exited, respawning")
+            spawn()
+    finally:
+        sock.close()
+
+
+def serve(handler_cls, host, port, mode="single", workers=2, threads=8, backlog=128, on_exit=None):
+    """on_exit() runs once in every process that served requests, after it stops."""
+    if mode not in MODES:
+        raise ValueError(f"unknown server mode {mode!r}, expected one of {MODES}")
+    if mode == "prefork":
+        serve_prefork(handler_cls, host, port, workers=workers, threads=threads, backlog=backlog,
+                      on_exit=on_exit)
+        return
+    try:
+        _serve(make_server(handler_cls, host, port,
+                           threads=threads if mode == "threaded" else 1, backlog=backlog))
+    finally:
+        if on_exit is not None:
+            on_exit()
@@ -1,30 +1,239 @@
+import os
+import re
 import sqlite3
+import threading
 from contextlib import contextmanager
-from pathlib import Path
+from time import perf_counter
 
-@contextmanager
-def connect(db_path="pyreactx.db"):
-    # DB lives in project root by default
-    Path(db_path).touch(exist_ok=True)
-    conn = sqlite3.connect(db_path)
+from . import metrics
+from .config import (DB_PATH, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_MMAP_SIZE,
+                     SQLITE_CACHE_SIZE, SQLITE_BUSY_TIMEOUT_MS, SQLITE_STATEMENT_CACHE)
+
+# Applied to every new connection; change with configure() before the first query.
+PRAGMAS = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "cache_size": SQLITE_CACHE_SIZE,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+}
+STATEMENT_CACHE = SQLITE_STATEMENT_CACHE
+
+# Connection pool: one long-lived connection per (thread, db file).
+_local = threading.local()
+_lock = threading.Lock()
+_open_conns = []
+_pid = os.getpid()
+_generation = 0  # bumped by close_all() so every thread drops its closed handles
+
+
+def configure(statement_cache=None, **pragmas):
+    global STATEMENT_CACHE
+    if statement_cache is not None:
+        STATEMENT_CACHE = statement_cache
+    PRAGMAS.update(pragmas)
+
+
+def _open(db_path):
+    conn = sqlite3.connect(db_path, timeout=PRAGMAS.get("busy_timeout", 5000) / 1000,
+                           cached_statements=STATEMENT_CACHE, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def get_connection(db_path=None):
+    """This thread's pooled connection to db_path (opened on first use)."""
+    global _open_conns, _pid
+    if _pid != os.getpid():
+        # forked child: never touch the parent's connections, start a fresh pool
+        with _lock:
+            _pid, _open_conns = os.getpid(), []
+    conns = getattr(_local, "conns", None)
+    if conns is None or _local.key != (_pid, _generation):
+        conns = _local.conns = {}
+        _local.key = (_pid, _generation)
+    db_path = db_path or DB_PATH
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = conns[db_path] = _open(db_path)
+        with _lock:
+            _open_conns.append(conn)
+    return conn
+
+
+def close_all():
+    """Close every pooled connection (e.g. on shutdown)."""
+    global _open_conns, _generation
+    with _lock:
+        conns, _open_conns = _open_conns, []
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+def _tx_depth():
+    depth = getattr(_local, "tx_depth", None)
+    if depth is None:
+        depth = _local.tx_depth = {}
+    return depth
+
+
+@contextmanager
+def connect(db_path=None):
+    conn = get_connection(db_path)
+    if _tx_depth().get(conn):
+        # inside transaction(): the outermost block commits
+        yield conn
+        return
+    try:
+        yield conn
+        if conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+@contextmanager
+def transaction(db_path=None):
+    """
+    Unit of work: every helper call inside the block shares this thread's connection
+    and one COMMIT (or ROLLBACK on error). Nested blocks join the outer one.
+
+        with transaction():
+            exec(...)
+            query_one(...)
+    """
+    conn = get_connection(db_path)
+    depth = _tx_depth()
+    outer = not depth.get(conn)
+    if outer:
+        if conn.in_transaction:
+            conn.commit()
+        # take the write lock up front instead of failing to upgrade a read lock later
+        conn.execute("BEGIN IMMEDIATE")
+    depth[conn] = depth.get(conn, 0) + 1
     try:
         yield conn
+    except BaseException:
+        depth[conn] -= 1
+        if outer:
+            conn.rollback()
+        raise
+    depth[conn] -= 1
+    if outer:
         conn.commit()
+
+# ---------- statement timing ----------
+_labels = {}  # sql -> metric labels
+_NUMBER = re.compile(r"\b\d+\b")
+
+def _label(sql):
+    label = _labels.get(sql)
+    if label is None:
+        # inlined numbers (LIMIT 11 OFFSET 40) would make a new series per value
+        label = (("sql", _NUMBER.sub("?", " ".join(sql.split()))[:200]),)
+        if len(_labels) < 1000:
+            _labels[sql] = label
+    return label
+
+# Threads being profiled (see profiling.py): ident -> [(sql label, seconds)], and the statement
+# each one is running right now. Both stay empty unless a request is being profiled.
+_traces = {}
+_running = {}
+
+@contextmanager
+def trace_statements():
+    """Collects (sql, seconds) for every statement this thread runs inside the block."""
+    ident = threading.get_ident()
+    trace = _traces[ident] = []
+    try:
+        yield trace
     finally:
-        conn.close()
+        _traces.pop(ident, None)
+        _running.pop(ident, None)
 
-def exec(sql, params=(), db_path="pyreactx.db"):
-    with connect(db_path) as c:
-        c.execute(sql, params)
+def running_statement(ident):
+    """SQL label of the statement a traced thread is executing, or None."""
+    return _running.get(ident)
 
-def query_all(sql, params=(), db_path="pyreactx.db"):
-    with connect(db_path) as c:
+class _timed:
+    """Records one statement's time (execute + fetch) in metrics."""
+    __slots__ = ("sql", "start")
+
+    def __init__(self, sql):
+        self.sql = sql
+
+    def __enter__(self):
+        self.start = perf_counter()
+        if _traces and threading.get_ident() in _traces:
+            _running[threading.get_ident()] = _label(self.sql)[0][1]
+
+    def __exit__(self, exc_type, exc, tb):
+        if metrics.REGISTRY.enabled:
+            label = _label(self.sql)
+            metrics.observe("pyreactx_db_query_duration_seconds", label, perf_counter() - self.start)
+            if exc_type is not None:
+                metrics.inc("pyreactx_db_query_errors_total", label)
+        if _traces:
+            trace = _traces.get(threading.get_ident())
+            if trace is not None:
+                _running.pop(threading.get_ident(), None)
+                trace.append((_label(self.sql)[0][1], perf_counter() - self.start))
+
+# ---------- helpers ----------
+def exec(sql, params=(), db_path=None):
+    """-> number of rows changed"""
+    with connect(db_path) as c, _timed(sql):
+        return c.execute(sql, params).rowcount
+
+def exec_insert(sql, params=(), db_path=None):
+    """-> lastrowid of the INSERT"""
+    with connect(db_path) as c, _timed(sql):
+        return c.execute(sql, params).lastrowid
+
+def exec_returning(sql, params=(), db_path=None):
+    """Write with a RETURNING clause (SQLite 3.35+) -> list of row dicts"""
+    with connect(db_path) as c, _timed(sql):
         cur = c.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
 
-def query_one(sql, params=(), db_path="pyreactx.db"):
+def exec_many(sql, seq_of_params, db_path=None):
+    """executemany in one commit -> number of rows changed"""
+    with connect(db_path) as c, _timed(sql):
+        return c.executemany(sql, seq_of_params).rowcount
+
+def query_all(sql, params=(), db_path=None):
+    with connect(db_path) as c, _timed(sql):
+        cur = c.execute(sql, params)
+        return [dict(r) for r in cur.fetchall()]
+
+def query_iter(sql, params=(), db_path=None, batch=500):
+    """
+    Generator of row dicts fetched `batch` at a time, for results too big to hold in memory.
+    Runs lazily on the thread that iterates it; close() it (or exhaust it) to release the cursor.
+    """
     with connect(db_path) as c:
+        with _timed(sql):  # the execute only: rows are fetched at the consumer's pace
+            cur = c.execute(sql, params)
+        try:
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    return
+                for r in rows:
+                    yield dict(r)
+        finally:
+            cur.close()
+
+def query_one(sql, params=(), db_path=None):
+    with connect(db_path) as c, _timed(sql):
         cur = c.execute(sql, params)
         r = cur.fetchone()
         return dict(r) if r else None
@@ -0,0 +1,75 @@
+"""
+Compare two benchmark JSON files (both from benchmarks.micro or both from benchmarks.load)
+and flag regressions beyond a threshold. Exits 1 when something regressed.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+"""
+import argparse
+import json
+import sys
+
+# load metrics: (json path, higher is better)
+LOAD_METRICS = (("rps", True), ("p50_ms", False), ("p95_ms", False), ("p99_ms", False))
+
+
+def _rows(data):
+    """-> {name: (value, higher_is_better)}"""
+    if data.get("kind") == "micro":
+        return {name: (r["ns_per_op"], False) for name, r in data["results"].items()}
+    if data.get("kind") == "load":
+        rows = {}
+        sections = [("overall", data["overall"])] + list(data["operations"].items())
+        for section, values in sections:
+            for metric, higher_better in LOAD_METRICS:
+                if values.get(metric) is not None:
+                    rows[f"{section}.{metric}"] = (values[metric], higher_better)
+        return rows
+    raise ValueError("not a benchmarks.micro or benchmarks.load result")
+
+
+def compare(baseline, current, threshold=10.0):
+    """-> list of (name, old, new, change %, verdict); verdict is 'regressed', 'improved' or ''"""
+    if baseline.get("kind") != current.get("kind"):
+        raise ValueError(f"can't compare {baseline.get('kind')} results with {current.get('kind')} results")
+    old, new = _rows(baseline), _rows(current)
+    out = []
+    for name in sorted(old.keys() & new.keys()):
+        (a, higher_better), (b, _) = old[name], new[name]
+        if not a:
+            continue
+        change = (b - a) / a * 100.0
+        worse = -change if higher_better else change
+        verdict = "regressed" if worse > threshold else "improved" if worse < -threshold else ""
+        out.append((name, a, b, change, verdict))
+    return out
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("baseline")
+    p.add_argument("current")
+    p.add_argument("--threshold", type=float, default=10.0, help="percent change treated as significant")
+    args = p.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    try:
+        rows = compare(baseline, current, args.threshold)
+    except ValueError as e:
+        p.error(str(e))
+
+    print(f"baseline {baseline['info'].get('commit')}  vs  current {current['info'].get('commit')}")
+    print(f"{'benchmark':<32}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, a, b, change, verdict in rows:
+        print(f"{name:<32}{a:>14,.1f}{b:>14,.1f}{change:>+9.1f}%  {verdict}")
+    regressed = [r for r in rows if r[4] == "regressed"]
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) beyond {args.threshold:g}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
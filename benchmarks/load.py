@@ -0,0 +1,298 @@
+"""
+HTTP load generator for the example API.
+
+Starts examples/hello_world/backend/main.py on a free port with a throwaway database
+(or targets --url), then runs --concurrency clients, each with its own user and
+keep-alive connection, looping over: health, list, create, toggle, delete, plus a
+login every --login-every iterations. Reports throughput and p50/p95/p99 per operation.
+
+    python -m benchmarks.load --mode threaded --concurrency 16 --duration 20 --json load.json
+    python -m benchmarks.load --url http://127.0.0.1:5000 --concurrency 4
+"""
+import argparse
+import http.client
+import json
+import os
+import secrets
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+
+from . import ROOT, percentile, run_info, write_json
+
+OPERATIONS = ("health", "login", "list", "create", "toggle", "delete")
+
+
+class Client:
+    """One simulated user on one keep-alive connection."""
+
+    def __init__(self, host, port, email, password, timeout=30.0):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.email, self.password = email, password
+        self.conn = None
+        self.token = None
+
+    def request(self, method, path, body=None, expect=(200,)):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        if self.token:
+            headers["Authorization"] = "Bearer " + self.token
+        data = json.dumps(body).encode() if body is not None else None
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self.conn.request(method, path, body=data, headers=headers)
+                resp = self.conn.getresponse()
+                raw = resp.read()
+                if resp.getheader("Connection", "").lower() == "close":
+                    self.close()
+                break
+            except (ConnectionError, http.client.HTTPException):
+                # the server may close an idle or max-requests connection: reconnect once
+                self.close()
+                if attempt == 2:
+                    raise
+        if resp.status not in expect:
+            raise RuntimeError(f"{method} {path} -> {resp.status} {raw[:200]!r}")
+        return json.loads(raw) if raw else None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def register(self):
+        self.request("POST", "/auth/register", {"email": self.email, "password": self.password}, expect=(200, 201, 409))
+
+    def login(self):
+        self.token = self.request("POST", "/auth/login", {"email": self.email, "password": self.password})["token"]
+
+
+def _worker(client, deadline, record_after, login_every, results, errors, stop):
+    iteration = 0
+    while not stop.is_set() and time.perf_counter() < deadline:
+        iteration += 1
+        todo_id = None
+        for op in OPERATIONS:
+            if op == "login" and (not login_every or iteration % login_every):
+                continue
+            if op in ("toggle", "delete") and todo_id is None:
+                continue
+            started = time.perf_counter()
+            try:
+                if op == "health":
+                    client.request("GET", "/health")
+                elif op == "login":
+                    client.login()
+                elif op == "list":
+                    client.request("GET", "/todos?limit=10&total=0")
+                elif op == "create":
+                    todo_id = client.request("POST", "/todos", {"title": "bench"}, expect=(201,))["id"]
+                elif op == "toggle":
+                    client.request("PATCH", f"/todos/{todo_id}/toggle")
+                else:
+                    client.request("DELETE", f"/todos/{todo_id}")
+            except Exception as e:
+                if started >= record_after:
+                    errors.append((op, repr(e)))
+                if op == "create":
+                    todo_id = None
+                continue
+            if started >= record_after:
+                results[op].append(time.perf_counter() - started)
+    client.close()
+
+
+def summarize(results, errors, elapsed):
+    ops = {}
+    total = 0
+    for op in OPERATIONS:
+        latencies = sorted(results[op])
+        n = len(latencies)
+        total += n
+        if not n and not any(e[0] == op for e in errors):
+            continue
+        ms = [x * 1000.0 for x in latencies]
+        ops[op] = {
+            "count": n,
+            "errors": sum(1 for e in errors if e[0] == op),
+            "rps": round(n / elapsed, 1) if elapsed else 0.0,
+            "mean_ms": round(sum(ms) / n, 3) if n else None,
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "max_ms": round(ms[-1], 3) if n else None,
+        }
+    every = sorted(x * 1000.0 for op in OPERATIONS for x in results[op])
+    overall = {
+        "requests": total,
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(every, 50), 3),
+        "p95_ms": round(percentile(every, 95), 3),
+        "p99_ms": round(percentile(every, 99), 3),
+    }
+    return ops, overall
+
+
+def run_load(host, port, concurrency=8, duration=10.0, warmup=2.0, login_every=20):
+    tag = secrets.token_hex(4)
+    clients = [Client(host, port, f"bench-{tag}-{i}@example.com", "bench-pass-" + tag) for i in range(concurrency)]
+    for c in clients:
+        c.register()
+        c.login()
+
+    results = {op: [] for op in OPERATIONS}
+    per_thread = [({op: [] for op in OPERATIONS}, []) for _ in clients]
+    stop = threading.Event()
+    start = time.perf_counter()
+    record_after = start + warmup
+    deadline = record_after + duration
+    threads = [threading.Thread(target=_worker, args=(c, deadline, record_after, login_every, r, e, stop), daemon=True)
+               for c, (r, e) in zip(clients, per_thread)]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        stop.set()
+        for t in threads:
+            t.join()
+    elapsed = min(time.perf_counter(), deadline) - record_after
+
+    errors = []
+    for r, e in per_thread:
+        for op in OPERATIONS:
+            results[op].extend(r[op])
+        errors.extend(e)
+    ops, overall = summarize(results, errors, elapsed)
+    return {"operations": ops, "overall": overall, "sample_errors": [f"{op}: {msg}" for op, msg in errors[:5]]}
+
+
+# ---------- local server ----------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(host, port, proc, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                conn.close()
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+def start_server(mode, workers, threads, env_overrides, workdir):
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "HOST": "127.0.0.1",
+        "PORT": str(port),
+        "JWT_SECRET": secrets.token_hex(32),
+        "SERVER_MODE": mode,
+        "WORKERS": str(workers),
+        "THREADS": str(threads),
+        "DB_PATH": os.path.join(workdir, "bench.db"),
+        "RATE_LIMIT_DB": os.path.join(workdir, "ratelimit.db"),
+        # the benchmark measures the server, not the limiter saying no
+        "RATE_LIMIT_PER_MIN": "1000000000",
+        "LOGIN_RATE_LIMIT_PER_MIN": "1000000000",
+        "ACCESS_LOG": "off",
+    })
+    env.update(env_overrides)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    log = open(os.path.join(workdir, "server.log"), "w")
+    proc = subprocess.Popen([sys.executable, "-m", "examples.hello_world.backend.main"], cwd=workdir, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    try:
+        _wait_ready("127.0.0.1", port, proc)
+    except Exception:
+        stop_server(proc)
+        log.close()
+        with open(log.name) as f:
+            sys.stderr.write(f.read())
+        raise
+    return proc, port, log
+
+
+def stop_server(proc, timeout=15.0):
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGTERM)
+        try:
+            proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def print_report(report, out=sys.stdout):
+    cols = ("count", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    out.write(f"{'operation':<10}" + "".join(f"{c:>10}" for c in cols) + "\n")
+    for op, row in report["operations"].items():
+        out.write(f"{op:<10}" + "".join(f"{row[c] if row[c] is not None else '-':>10}" for c in cols) + "\n")
+    o = report["overall"]
+    out.write(f"\n{o['requests']} requests in {o['seconds']}s: {o['rps']} req/s, "
+              f"p50 {o['p50_ms']}ms, p95 {o['p95_ms']}ms, p99 {o['p99_ms']}ms, {o['errors']} errors\n")
+    for e in report.get("sample_errors", []):
+        out.write(f"  error: {e}\n")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--url", help="benchmark a running server instead of starting one")
+    p.add_argument("--mode", default="threaded", help="SERVER_MODE of the started server")
+    p.add_argument("--workers", type=int, default=2, help="prefork workers of the started server")
+    p.add_argument("--threads", type=int, default=8, help="THREADS of the started server")
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                   help="extra environment for the started server (repeatable), e.g. BCRYPT_ROUNDS=4")
+    p.add_argument("--concurrency", "-c", type=int, default=8)
+    p.add_argument("--duration", "-d", type=float, default=10.0, help="measured seconds")
+    p.add_argument("--warmup", type=float, default=2.0, help="seconds run before measuring")
+    p.add_argument("--login-every", type=int, default=20, help="log in again every N iterations (0 = never)")
+    p.add_argument("--json", help="write the report here ('-' for stdout)")
+    args = p.parse_args(argv)
+
+    overrides = dict(kv.split("=", 1) for kv in args.env)
+    config = {"concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup,
+              "login_every": args.login_every}
+    if args.url:
+        u = urlparse(args.url)
+        config["url"] = args.url
+        report = run_load(u.hostname, u.port or 80, args.concurrency, args.duration, args.warmup, args.login_every)
+    else:
+        config.update(mode=args.mode, workers=args.workers, threads=args.threads, env=overrides)
+        with tempfile.TemporaryDirectory(prefix="pyreactx-bench-") as workdir:
+            proc, port, log = start_server(args.mode, args.workers, args.threads, overrides, workdir)
+            try:
+                report = run_load("127.0.0.1", port, args.concurrency, args.duration, args.warmup, args.login_every)
+            finally:
+                stop_server(proc)
+                log.close()
+
+    report = {"kind": "load", "info": run_info(), "config": config, **report}
+    print_report(report, sys.stderr if args.json == "-" else sys.stdout)
+    if args.json:
+        write_json(args.json, report)
+    return 1 if report["overall"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
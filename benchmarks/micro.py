@@ -0,0 +1,181 @@
+"""
+Micro-benchmarks of the framework's hot paths, run in-process with no network.
+
+    python -m benchmarks.micro                    # all groups
+    python -m benchmarks.micro --only route,db    # some groups
+    python -m benchmarks.micro --json micro.json  # for benchmarks.compare
+"""
+import argparse
+import http.client
+import io
+import os
+import statistics
+import sys
+import tempfile
+import timeit
+from types import SimpleNamespace
+
+from backend import simpledb
+from backend.accesslog import AccessLog
+from backend.app import App
+
+from . import run_info, write_json
+
+# The example API's route table, kept here so the benchmarks don't depend on the example app.
+ROUTES = [
+    ("/health", ["GET"]), ("/hello", ["GET"]), ("/auth/register", ["POST"]), ("/auth/login", ["POST"]),
+    ("/me", ["GET"]), ("/todos", ["GET", "POST"]), ("/todos/batch", ["POST"]), ("/todos/export", ["GET"]),
+    ("/todos/:id<int>/toggle", ["PATCH"]), ("/todos/:id<int>", ["DELETE"]), ("/openapi.json", ["GET"]),
+]
+
+TODOS = {"items": [{"id": i, "title": f"todo number {i}", "done": i % 2 == 0} for i in range(10)],
+         "limit": 10, "page": 1, "next_cursor": 0, "total": 10}
+
+
+REPEAT = 5
+
+
+def measure(fn):
+    """-> ns per call: best and median of REPEAT runs of a loop sized to take >= 0.2s"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [t / number * 1e9 for t in timer.repeat(REPEAT, number)]
+    return {"ns_per_op": round(min(runs), 1), "median_ns": round(statistics.median(runs), 1), "loops": number}
+
+
+def _app(middlewares=0):
+    app = App(access_log=AccessLog(None))
+    for pattern, methods in ROUTES:
+        app.route(pattern, methods=methods)(lambda request: {"ok": True})
+    for _ in range(middlewares):
+        app.use(lambda next_handler: (lambda request: next_handler(request)))
+    app.freeze()
+    return app
+
+
+def _headers(raw=b"Host: localhost\r\nAuthorization: Bearer abc\r\nAccept-Encoding: gzip\r\n\r\n"):
+    return http.client.parse_headers(io.BytesIO(raw))
+
+
+# ---------- groups ----------
+
+def bench_route():
+    app = _app()
+    return {
+        "match_route.static": measure(lambda: app._match_route("/health")),
+        "match_route.param": measure(lambda: app._match_route("/todos/123/toggle")),
+        "match_route.query": measure(lambda: app._match_route("/todos?page=2&limit=10")),
+        "match_route.miss": measure(lambda: app._match_route("/nope/123")),
+        "router.lookup.param": measure(lambda: app.router.lookup("DELETE", "/todos/42")),
+    }
+
+
+def bench_middleware():
+    out = {}
+    headers = _headers()
+    for n in (0, 3, 10):
+        app = _app(middlewares=n)
+        handler = app.routes["/todos"]["GET"]
+        chain = app._chain("/todos", "GET", handler)
+        request = app._build_request("GET", SimpleNamespace(path="/todos", query=""), headers, {}, None, "127.0.0.1")
+        out[f"dispatch.middlewares_{n}"] = measure(lambda: chain(request))
+    app = _app(middlewares=3)
+    parsed = SimpleNamespace(path="/todos", query="page=2&limit=10")
+    out["build_request+query"] = measure(
+        lambda: app._build_request("GET", parsed, headers, {}, None, "127.0.0.1")["query"])
+    return out
+
+
+class _Sink(io.RawIOBase):
+    """wfile stand-in that only counts bytes."""
+    def writable(self):
+        return True
+
+    def write(self, b):
+        return len(b)
+
+
+def _handler(app, accept_encoding=None):
+    Handler = app._handler_class()
+    h = Handler.__new__(Handler)  # no socket: just enough state for _send_json
+    h.wfile = _Sink()
+    h.request_version = "HTTP/1.1"
+    h.command = "GET"
+    h.requests_served = 0
+    h.body_pending = 0
+    h.close_connection = False
+    h.server = SimpleNamespace(keep_alive=True, draining=False)
+    raw = b"Host: localhost\r\n" + (f"Accept-Encoding: {accept_encoding}\r\n".encode() if accept_encoding else b"")
+    h.headers = _headers(raw + b"\r\n")
+    return h
+
+
+def bench_send_json():
+    app = _app()
+    small, big = {"status": "ok"}, {"items": TODOS["items"] * 20}
+    h, hz = _handler(app), _handler(app, "gzip")
+    return {
+        "send_json.small": measure(lambda: h._send_json(small)),
+        "send_json.todos_page": measure(lambda: h._send_json(TODOS)),
+        "send_json.large": measure(lambda: h._send_json(big)),
+        "send_json.large_gzip": measure(lambda: hz._send_json(big)),
+        "json_dumps.todos_page": measure(lambda: app.json_dumps(TODOS)),
+    }
+
+
+def bench_db():
+    out = {}
+    with tempfile.TemporaryDirectory(prefix="pyreactx-micro-") as d:
+        db = os.path.join(d, "micro.db")
+        simpledb.exec("CREATE TABLE todos (id INTEGER PRIMARY KEY, title TEXT, done INTEGER, user_id INTEGER)", db_path=db)
+        simpledb.exec("CREATE INDEX idx ON todos(user_id, id DESC)", db_path=db)
+        simpledb.exec_many("INSERT INTO todos(title, done, user_id) VALUES (?,?,?)",
+                           [(f"t{i}", i % 2, i % 10) for i in range(10_000)], db_path=db)
+        out["query_one.pk"] = measure(lambda: simpledb.query_one("SELECT id, title, done FROM todos WHERE id=?", (500,), db_path=db))
+        out["query_all.page10"] = measure(lambda: simpledb.query_all(
+            "SELECT id, title, done FROM todos WHERE user_id=? ORDER BY id DESC LIMIT 11", (3,), db_path=db))
+        out["exec.update"] = measure(lambda: simpledb.exec("UPDATE todos SET done = 1 - done WHERE id=?", (7,), db_path=db))
+        out["exec_returning.insert"] = measure(lambda: simpledb.exec_returning(
+            "INSERT INTO todos(title, done, user_id) VALUES (?,?,?) RETURNING id, title, done", ("x", 0, 1), db_path=db))
+        rows = [("b", 0, 2)] * 100
+        out["exec_many.100"] = measure(lambda: simpledb.exec_many(
+            "INSERT INTO todos(title, done, user_id) VALUES (?,?,?)", rows, db_path=db))
+
+        def tx10():
+            with simpledb.transaction(db):
+                for _ in range(10):
+                    simpledb.exec("INSERT INTO todos(title, done, user_id) VALUES ('tx', 0, 4)", db_path=db)
+        out["transaction.10_inserts"] = measure(tx10)
+        simpledb.close_all()
+    return out
+
+
+GROUPS = {"route": bench_route, "middleware": bench_middleware, "send_json": bench_send_json, "db": bench_db}
+
+
+def main(argv=None):
+    global REPEAT
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--only", help="comma separated groups: " + ",".join(GROUPS))
+    p.add_argument("--repeat", type=int, default=REPEAT, help="timed runs per benchmark (best is reported)")
+    p.add_argument("--json", help="write results here ('-' for stdout)")
+    args = p.parse_args(argv)
+    REPEAT = args.repeat
+
+    names = args.only.split(",") if args.only else list(GROUPS)
+    unknown = set(names) - set(GROUPS)
+    if unknown:
+        p.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+    out = sys.stderr if args.json == "-" else sys.stdout
+    results = {}
+    for name in names:
+        for bench, r in GROUPS[name]().items():
+            results[bench] = r
+            out.write(f"{bench:<28} {r['ns_per_op']:>12,.0f} ns/op   (median {r['median_ns']:,.0f})\n")
+    if args.json:
+        write_json(args.json, {"kind": "micro", "info": run_info(), "results": results})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,43 +1,104 @@
-from backend.app import App
-from backend.simpledb import exec as db_exec, query_all, query_one
-from backend.auth import hash_password, check_password, create_token, verify_token, parse_bearer
-from backend.config import HOST, PORT, CORS_ALLOW_ORIGIN, RATE_LIMIT_PER_MIN
-
-app = App()
-
-# ---------- DB bootstrap ----------
-db_exec("""
-CREATE TABLE IF NOT EXISTS users (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  email TEXT NOT NULL UNIQUE,
-  password_hash BLOB NOT NULL
-)
-""")
-
-db_exec("""
-CREATE TABLE IF NOT EXISTS todos (
-  id INTEGER PRIMARY KEY AUTOINCREMENT,
-  title TEXT NOT NULL,
-  done INTEGER NOT NULL DEFAULT 0,
-  user_id INTEGER,
-  FOREIGN KEY (user_id) REFERENCES users(id)
-)
-""")
-
-# Seed demo user if not exists
-if not query_one("SELECT id FROM users WHERE email=?", ("demo@user.com",)):
-    db_exec("INSERT INTO users(email, password_hash) VALUES (?,?)",
-            ("demo@user.com", hash_password("demo123")))
+import hmac
+import sqlite3
+
+from backend import metrics
+from backend.accesslog import AccessLog
+from backend.app import App, Stream
+from backend.cache import OwnerCache, make_versions
+from backend.profiling import Profiler
+from backend.migrations import migrate
+from backend.simpledb import (close_all, exec as db_exec, exec_returning, query_all, query_iter, query_one,
+                              transaction)
+from backend.auth import (hash_password, check_password, needs_rehash, PasswordPoolBusy,
+                          create_token, verify_token, parse_bearer, shutdown_password_pool)
+from backend.config import (HOST, PORT, CORS_ALLOW_ORIGIN, RATE_LIMIT_PER_MIN, RATE_LIMIT_BACKEND,
+                            RATE_LIMIT_DB, LOGIN_RATE_LIMIT_PER_MIN, MAX_BODY_BYTES,
+                            ACCESS_LOG, ACCESS_LOG_FORMAT, ACCESS_LOG_SAMPLE, ACCESS_LOG_QUEUE,
+                            TODO_CACHE_BYTES, TODO_CACHE_VERSIONS, TODO_CACHE_TTL, METRICS_TOKEN,
+                            PROFILE_MODE, PROFILE_DIR, PROFILE_TOKEN, PROFILE_HEADER, PROFILE_SAMPLE,
+                            PROFILE_INTERVAL_MS)
+from backend.ratelimit import RateLimiter, SlidingWindowCounter, TokenBucket, make_backend, rate_limit
+
+access_log = AccessLog(None if ACCESS_LOG == "off" else ACCESS_LOG, sample=ACCESS_LOG_SAMPLE,
+                       fmt=ACCESS_LOG_FORMAT, queue_size=ACCESS_LOG_QUEUE)
+profiler = Profiler(PROFILE_MODE, PROFILE_DIR, token=PROFILE_TOKEN, header=PROFILE_HEADER, sample=PROFILE_SAMPLE,
+                    interval=PROFILE_INTERVAL_MS / 1000.0) if PROFILE_MODE != "off" else None
+app = App(max_body_size=MAX_BODY_BYTES, access_log=access_log, profiler=profiler)
+
+# ---------- rate limits ----------
+# one backend for all limiters; with RATE_LIMIT_BACKEND=sqlite every worker shares the budget
+_limit_backend = make_backend(RATE_LIMIT_BACKEND, RATE_LIMIT_DB)
+global_limiter = RateLimiter(SlidingWindowCounter(RATE_LIMIT_PER_MIN, 60), _limit_backend)
+# login on its own, smaller budget (bursts of 5) to slow down password guessing
+login_limiter = RateLimiter(TokenBucket(LOGIN_RATE_LIMIT_PER_MIN / 60, burst=5), _limit_backend)
+
+# ---------- schema ----------
+# Append new steps with the next version; never edit one that has shipped.
+# (IF NOT EXISTS lets databases created before migrations existed adopt them.)
+MIGRATIONS = [
+    (1, "create users", """
+        CREATE TABLE IF NOT EXISTS users (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          email TEXT NOT NULL UNIQUE,
+          password_hash BLOB NOT NULL
+        )
+    """),
+    (2, "create todos", """
+        CREATE TABLE IF NOT EXISTS todos (
+          id INTEGER PRIMARY KEY AUTOINCREMENT,
+          title TEXT NOT NULL,
+          done INTEGER NOT NULL DEFAULT 0,
+          user_id INTEGER,
+          FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """),
+    # per-user listing walks this index newest-first; COUNT(*) per user is answered from it too
+    (3, "index todos by user", "CREATE INDEX IF NOT EXISTS idx_todos_user_id ON todos(user_id, id DESC)"),
+]
+
+# ---------- lifecycle ----------
+# Nothing above touches the database: importing this module is cheap. The server runs these
+# once per process (once in the master under prefork); tests can call app.startup().
+@app.on_startup
+def migrate_db():
+    applied = migrate(MIGRATIONS)
+    if applied:
+        print(f"applied migrations {applied}")
+
+@app.on_startup
+def seed_demo_user():
+    if not query_one("SELECT id FROM users WHERE email=?", ("demo@user.com",)):
+        db_exec("INSERT INTO users(email, password_hash) VALUES (?,?)",
+                ("demo@user.com", hash_password("demo123")))
+        # startup runs in the prefork master right before fork(): don't fork with live bcrypt threads
+        shutdown_password_pool()
+
+app.on_shutdown(close_all)  # pooled SQLite connections
+
+# ---------- todo list cache ----------
+# GET /todos pages and totals per user; every write below calls invalidate_todos(user_id) once committed.
+# With TODO_CACHE_VERSIONS=sqlite the version lives in the DB, so all workers see it.
+todo_cache = OwnerCache("todos", make_versions(TODO_CACHE_VERSIONS), max_bytes=TODO_CACHE_BYTES,
+                        ttl=TODO_CACHE_TTL or None) if TODO_CACHE_BYTES > 0 else None
+
+def cached(user_id, key, loader):
+    return todo_cache.get_or_load(user_id, key, loader) if todo_cache is not None else loader()
+
+def invalidate_todos(user_id):
+    if todo_cache is not None:
+        todo_cache.invalidate(user_id)
 
 # ---------- health (public) ----------
-@app.route("/health", methods=["GET"])
+@app.route("/health", methods=["GET"], cache="no-cache")
 def health(request=None):
     return {"status": "ok"}
 
 # ---------- auth helper (middleware wrapper) ----------
 def auth_required(next_handler):
     def wrapped(request):
-        token = parse_bearer(request["headers"].get("Authorization"))
+        token = parse_bearer(request.header("Authorization"))
+        if not token:
+            metrics.inc("pyreactx_auth_failures_total", (("reason", "missing_token"),))
         claims = verify_token(token) if token else None
         if not claims:
             return ({"error": "unauthorized"}, 401)
@@ -46,10 +107,13 @@ def auth_required(next_handler):
     return wrapped
 
 # ---------- public routes ----------
-@app.route("/hello", methods=["GET"])
+@app.route("/hello", methods=["GET"], cache="public, max-age=300")
 def hello(request=None):
     return {"message": "Hello from PyReactX on macOS 🎉 (SQLite + JWT + .env + rate-limit)"}
 
+def busy(e):
+    return ({"error": "server busy, retry shortly"}, 503, {"Retry-After": str(e.retry_after)})
+
 # POST /auth/register {email,password}
 @app.route("/auth/register", methods=["POST"])
 def register(request):
@@ -62,13 +126,18 @@ def register(request):
         return ({"error": "email and password required"}, 400)
     if query_one("SELECT id FROM users WHERE email=?", (email,)):
         return ({"error": "email already in use"}, 409)
-    db_exec("INSERT INTO users(email, password_hash) VALUES (?,?)", (email, hash_password(password)))
-    user = query_one("SELECT id, email FROM users WHERE email=?", (email,))
+    try:
+        user = exec_returning("INSERT INTO users(email, password_hash) VALUES (?,?) RETURNING id, email",
+                              (email, hash_password(password)))[0]
+    except PasswordPoolBusy as e:
+        return busy(e)
+    except sqlite3.IntegrityError:  # lost a race with a concurrent register
+        return ({"error": "email already in use"}, 409)
     token = create_token(user["id"], user["email"])
     return {"user": user, "token": token}
 
 # POST /auth/login {email,password}
-@app.route("/auth/login", methods=["POST"])
+@app.route("/auth/login", methods=["POST"], middlewares=[rate_limit(login_limiter, scope="login")])
 def login(request):
     data = request["json"]
     if not data:
@@ -76,99 +145,222 @@ def login(request):
     email = (data.get("email") or "").strip().lower()
     password = data.get("password") or ""
     user = query_one("SELECT id, email, password_hash FROM users WHERE email=?", (email,))
-    if not user or not check_password(password, user["password_hash"]):
+    try:
+        ok = bool(user) and check_password(password, user["password_hash"])
+    except PasswordPoolBusy as e:
+        return busy(e)
+    if not ok:
+        metrics.inc("pyreactx_auth_failures_total", (("reason", "bad_credentials"),))
         return ({"error": "invalid credentials"}, 401)
+    if needs_rehash(user["password_hash"]):
+        # BCRYPT_ROUNDS changed since this hash was made: upgrade it while we have the password
+        try:
+            db_exec("UPDATE users SET password_hash=? WHERE id=?", (hash_password(password), user["id"]))
+        except PasswordPoolBusy:
+            pass  # a later login will try again
     token = create_token(user["id"], user["email"])
     return {"user": {"id": user["id"], "email": user["email"]}, "token": token}
 
 # ---------- protected routes ----------
-@app.route("/me", methods=["GET"])
+@app.route("/me", methods=["GET"], middlewares=[auth_required])
 def me(request):
     return {"user": request.get("user")}
 
-# GET /todos?page=1&limit=10
-@app.route("/todos", methods=["GET"])
+# GET /todos?page=1&limit=10          (offset paging, includes total)
+# GET /todos?after=<id>&limit=10      (keyset paging from next_cursor, total only with &total=1)
+@app.route("/todos", methods=["GET"], middlewares=[auth_required])
 def list_todos(request):
     user = request.get("user")
     if not user:
         return ({"error": "unauthorized"}, 401)
 
     # pagination parse + bounds
+    query = request["query"]
+    keyset = "after" in query
     try:
-        page = int(request["query"].get("page", 1))
-        limit = int(request["query"].get("limit", 10))
+        page = int(query.get("page", 1))
+        limit = int(query.get("limit", 10))
+        after = int(query["after"]) if keyset else None
     except Exception:
         return ({"error": "bad pagination params"}, 400)
     page = max(page, 1)
     limit = max(min(limit, 50), 1)
     offset = (page - 1) * limit
+    want_total = query.get("total", "0" if keyset else "1") not in ("0", "false")
 
+    # One extra row tells us whether there is a next page.
     # Inline LIMIT/OFFSET (some sqlite builds dislike placeholders there)
-    items_sql = (
-        "SELECT id, title, done FROM todos "
-        "WHERE user_id=? "
-        f"ORDER BY id DESC LIMIT {limit} OFFSET {offset}"
-    )
-    items = query_all(items_sql, (user["id"],))
-    for r in items:
-        r["done"] = bool(r["done"])
-
-    total_row = query_one("SELECT COUNT(*) AS c FROM todos WHERE user_id=?", (user["id"],))
-    total = total_row["c"] if total_row else 0
-
-    return {"items": items, "page": page, "limit": limit, "total": total}
+    def load_page():
+        if keyset:
+            items_sql = (
+                "SELECT id, title, done FROM todos "
+                "WHERE user_id=? AND id<? "
+                f"ORDER BY id DESC LIMIT {limit + 1}"
+            )
+            items = query_all(items_sql, (user["id"], after))
+        else:
+            items_sql = (
+                "SELECT id, title, done FROM todos "
+                "WHERE user_id=? "
+                f"ORDER BY id DESC LIMIT {limit + 1} OFFSET {offset}"
+            )
+            items = query_all(items_sql, (user["id"],))
+        has_more = len(items) > limit
+        items = items[:limit]
+        for r in items:
+            r["done"] = bool(r["done"])
+        return {"items": items, "next_cursor": items[-1]["id"] if has_more else None}
+
+    def load_total():
+        total_row = query_one("SELECT COUNT(*) AS c FROM todos WHERE user_id=?", (user["id"],))
+        return total_row["c"] if total_row else 0
+
+    page_key = ("after", after, limit) if keyset else ("page", page, limit)
+    body = {**cached(user["id"], page_key, load_page), "limit": limit}
+    if not keyset:
+        body["page"] = page
+    if want_total:
+        body["total"] = cached(user["id"], ("total",), load_total)
+    return body
+
+def clean_title(title):
+    """-> (stripped title, None) or (None, error message)"""
+    if title is not None and not isinstance(title, str):
+        return None, "title must be a string"
+    title = (title or "").strip()
+    return (title, None) if title else (None, "title is required")
+
+def is_todo_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)  # JSON true is not todo 1
 
 # POST /todos {title}
-@app.route("/todos", methods=["POST"])
+@app.route("/todos", methods=["POST"], middlewares=[auth_required])
 def create_todo(request):
     user = request.get("user")
     if not user:
         return ({"error": "unauthorized"}, 401)
 
     data = request["json"]
-    if not data:
+    if not isinstance(data, dict):
         return ({"error": "invalid JSON body"}, 400)
-    title = (data.get("title") or "").strip()
-    if not title:
-        return ({"error": "title is required"}, 400)
+    title, error = clean_title(data.get("title"))
+    if error:
+        return ({"error": error}, 400)
 
-    db_exec("INSERT INTO todos(title, done, user_id) VALUES (?,?,?)", (title, 0, user["id"]))
-    item = query_one("SELECT id, title, done FROM todos WHERE user_id=? ORDER BY id DESC LIMIT 1", (user["id"],))
+    item = exec_returning("INSERT INTO todos(title, done, user_id) VALUES (?,?,?) RETURNING id, title, done",
+                          (title, 0, user["id"]))[0]
+    invalidate_todos(user["id"])
     item["done"] = bool(item["done"])
     return (item, 201)
 
 # PATCH /todos/:id/toggle
-@app.route("/todos/:id/toggle", methods=["PATCH"])
+@app.route("/todos/:id<int>/toggle", methods=["PATCH"], middlewares=[auth_required])
 def toggle_todo(request):
     user = request.get("user")
     if not user:
         return ({"error": "unauthorized"}, 401)
 
     tid = request["params"]["id"]
-    row = query_one("SELECT done FROM todos WHERE id=? AND user_id=?", (tid, user["id"]))
-    if not row:
+    rows = exec_returning("UPDATE todos SET done = 1 - done WHERE id=? AND user_id=? RETURNING id, title, done",
+                          (tid, user["id"]))
+    if not rows:
         return ({"error": "not found"}, 404)
-    new_val = 0 if row["done"] else 1
-    db_exec("UPDATE todos SET done=? WHERE id=? AND user_id=?", (new_val, tid, user["id"]))
-    item = query_one("SELECT id, title, done FROM todos WHERE id=? AND user_id=?", (tid, user["id"]))
+    invalidate_todos(user["id"])
+    item = rows[0]
     item["done"] = bool(item["done"])
     return item
 
 # DELETE /todos/:id
-@app.route("/todos/:id", methods=["DELETE"])
+@app.route("/todos/:id<int>", methods=["DELETE"], middlewares=[auth_required])
 def delete_todo(request):
     user = request.get("user")
     if not user:
         return ({"error": "unauthorized"}, 401)
 
     tid = request["params"]["id"]
-    if not query_one("SELECT id FROM todos WHERE id=? AND user_id=?", (tid, user["id"])):
+    if not db_exec("DELETE FROM todos WHERE id=? AND user_id=?", (tid, user["id"])):
         return ({"error": "not found"}, 404)
-    db_exec("DELETE FROM todos WHERE id=? AND user_id=?", (tid, user["id"]))
+    invalidate_todos(user["id"])
     return ({"status": "deleted"}, 200)
 
+# POST /todos/batch {create:[{title}], toggle:[id], delete:[id]}
+MAX_BATCH_ITEMS = 500
+
+@app.route("/todos/batch", methods=["POST"], middlewares=[auth_required])
+def batch_todos(request):
+    user = request.get("user")
+    if not user:
+        return ({"error": "unauthorized"}, 401)
+
+    data = request["json"]
+    if not isinstance(data, dict):
+        return ({"error": "invalid JSON body"}, 400)
+    creates = data.get("create") or []
+    toggles = data.get("toggle") or []
+    deletes = data.get("delete") or []
+    if not all(isinstance(x, list) for x in (creates, toggles, deletes)):
+        return ({"error": "create, toggle and delete must be arrays"}, 400)
+    if len(creates) + len(toggles) + len(deletes) > MAX_BATCH_ITEMS:
+        return ({"error": f"at most {MAX_BATCH_ITEMS} items per batch"}, 400)
+
+    results = {"create": [], "toggle": [], "delete": []}
+    # one transaction: one commit/fsync for the whole batch, all-or-nothing on server errors
+    with transaction():
+        for entry in creates:
+            title, error = clean_title(entry.get("title") if isinstance(entry, dict) else None)
+            if error:
+                results["create"].append({"ok": False, "error": error})
+                continue
+            item = exec_returning("INSERT INTO todos(title, done, user_id) VALUES (?,?,?) RETURNING id, title, done",
+                                  (title, 0, user["id"]))[0]
+            item["done"] = bool(item["done"])
+            results["create"].append({"ok": True, "item": item})
+
+        for tid in toggles:
+            rows = exec_returning("UPDATE todos SET done = 1 - done WHERE id=? AND user_id=? RETURNING id, title, done",
+                                  (tid, user["id"])) if is_todo_id(tid) else []
+            if not rows:
+                results["toggle"].append({"id": tid, "ok": False, "error": "not found"})
+                continue
+            item = rows[0]
+            item["done"] = bool(item["done"])
+            results["toggle"].append({"id": tid, "ok": True, "item": item})
+
+        for tid in deletes:
+            ok = is_todo_id(tid) and db_exec("DELETE FROM todos WHERE id=? AND user_id=?", (tid, user["id"])) > 0
+            results["delete"].append({"id": tid, "ok": True} if ok else {"id": tid, "ok": False, "error": "not found"})
+
+    if any(r["ok"] for part in results.values() for r in part):
+        invalidate_todos(user["id"])
+
+    return results
+
+# GET /todos/export -> one JSON todo per line, streamed straight from the cursor
+@app.route("/todos/export", methods=["GET"], middlewares=[auth_required])
+def export_todos(request):
+    user = request.get("user")
+    if not user:
+        return ({"error": "unauthorized"}, 401)
+
+    rows = query_iter("SELECT id, title, done FROM todos WHERE user_id=? ORDER BY id DESC", (user["id"],))
+    return Stream(({**r, "done": bool(r["done"])} for r in rows),
+                  headers={"Content-Disposition": 'attachment; filename="todos.ndjson"'})
+
+# ---------- metrics (Prometheus text) ----------
+# labels include raw SQL, so the endpoint is opt-in and needs METRICS_TOKEN as a bearer token
+def metrics_token_required(next_handler):
+    def wrapped(request):
+        token = parse_bearer(request.header("Authorization")) or ""
+        if not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            return ({"error": "unauthorized"}, 401)
+        return next_handler(request)
+    return wrapped
+
+if metrics.REGISTRY.enabled and METRICS_TOKEN:
+    app.expose_metrics("/metrics", middlewares=[metrics_token_required])
+
 # ---------- OpenAPI spec ----------
-@app.route("/openapi.json", methods=["GET"])
+@app.route("/openapi.json", methods=["GET"], cache="public, max-age=3600")
 def openapi_json(request=None):
     spec = {
         "openapi": "3.0.3",
@@ -208,7 +400,8 @@ def openapi_json(request=None):
                             }
                         }}}},
                         "400": {"$ref":"#/components/responses/BadRequest"},
-                        "409": {"$ref":"#/components/responses/Conflict"}
+                        "409": {"$ref":"#/components/responses/Conflict"},
+                        "503": {"$ref":"#/components/responses/Busy"}
                     }
                 }
             },
@@ -229,7 +422,8 @@ def openapi_json(request=None):
                                 "token":{"type":"string"}
                             }
                         }}}},
-                        "401": {"$ref":"#/components/responses/Unauthorized"}
+                        "401": {"$ref":"#/components/responses/Unauthorized"},
+                        "503": {"$ref":"#/components/responses/Busy"}
                     }
                 }
             },
@@ -249,7 +443,9 @@ def openapi_json(request=None):
                     "security": [{"bearerAuth": []}],
                     "parameters": [
                         {"name":"page","in":"query","schema":{"type":"integer","default":1}},
-                        {"name":"limit","in":"query","schema":{"type":"integer","default":10}}
+                        {"name":"limit","in":"query","schema":{"type":"integer","default":10}},
+                        {"name":"after","in":"query","description":"Keyset cursor: next_cursor of the previous page","schema":{"type":"integer"}},
+                        {"name":"total","in":"query","description":"Include total (default on for page, off for after)","schema":{"type":"boolean"}}
                     ],
                     "responses": {
                         "200": {"description":"OK","content":{"application/json":{"schema":{"$ref":"#/components/schemas/TodoList"}}}},
@@ -269,6 +465,34 @@ def openapi_json(request=None):
                     }
                 }
             },
+            "/todos/batch": {
+                "post": {
+                    "summary": "Create, toggle and delete todos in one transaction",
+                    "security": [{"bearerAuth": []}],
+                    "requestBody": {"required": True, "content":{"application/json":{"schema":{
+                        "type":"object","properties":{
+                            "create":{"type":"array","items":{"type":"object","required":["title"],"properties":{"title":{"type":"string"}}}},
+                            "toggle":{"type":"array","items":{"type":"integer"}},
+                            "delete":{"type":"array","items":{"type":"integer"}}
+                        }
+                    }}}},
+                    "responses": {
+                        "200": {"description":"Per-item results","content":{"application/json":{"schema":{"$ref":"#/components/schemas/BatchResult"}}}},
+                        "400": {"$ref":"#/components/responses/BadRequest"},
+                        "401": {"$ref":"#/components/responses/Unauthorized"}
+                    }
+                }
+            },
+            "/todos/export": {
+                "get": {
+                    "summary": "Export all todos as NDJSON (streamed)",
+                    "security": [{"bearerAuth": []}],
+                    "responses": {
+                        "200": {"description":"One Todo per line","content":{"application/x-ndjson":{"schema":{"$ref":"#/components/schemas/Todo"}}}},
+                        "401": {"$ref":"#/components/responses/Unauthorized"}
+                    }
+                }
+            },
             "/todos/{id}/toggle": {
                 "patch": {
                     "summary":"Toggle done",
@@ -303,63 +527,39 @@ def openapi_json(request=None):
                 "Todo": {"type":"object","properties":{"id":{"type":"integer"},"title":{"type":"string"},"done":{"type":"boolean"}}},
                 "TodoList": {"type":"object","properties":{
                     "items":{"type":"array","items":{"$ref":"#/components/schemas/Todo"}},
-                    "page":{"type":"integer"},"limit":{"type":"integer"},"total":{"type":"integer"}
+                    "page":{"type":"integer"},"limit":{"type":"integer"},"total":{"type":"integer"},
+                    "next_cursor":{"type":"integer","nullable":True}
+                }},
+                "BatchItem": {"type":"object","properties":{
+                    "id":{"type":"integer"},"ok":{"type":"boolean"},
+                    "item":{"$ref":"#/components/schemas/Todo"},"error":{"type":"string"}
+                }},
+                "BatchResult": {"type":"object","properties":{
+                    "create":{"type":"array","items":{"$ref":"#/components/schemas/BatchItem"}},
+                    "toggle":{"type":"array","items":{"$ref":"#/components/schemas/BatchItem"}},
+                    "delete":{"type":"array","items":{"$ref":"#/components/schemas/BatchItem"}}
                 }}
             },
             "responses": {
                 "BadRequest": {"description":"Bad request","content":{"application/json":{"schema":{"type":"object","properties":{"error":{"type":"string"}}}}}},
                 "Unauthorized": {"description":"Unauthorized","content":{"application/json":{"schema":{"type":"object","properties":{"error":{"type":"string"}}}}}},
                 "NotFound": {"description":"Not found","content":{"application/json":{"schema":{"type":"object","properties":{"error":{"type":"string"}}}}}},
-                "Conflict": {"description":"Conflict","content":{"application/json":{"schema":{"type":"object","properties":{"error":{"type":"string"}}}}}}
+                "Conflict": {"description":"Conflict","content":{"application/json":{"schema":{"type":"object","properties":{"error":{"type":"string"}}}}}},
+                "Busy": {"description":"Password hashing queue full, retry after the Retry-After header","content":{"application/json":{"schema":{"type":"object","properties":{"error":{"type":"string"}}}}}}
             }
         }
     }
     return spec
 
 
-# ---------- simple global rate-limit middleware ----------
-import time
-from collections import defaultdict, deque
-from backend.config import RATE_LIMIT_PER_MIN
-
-_requests = defaultdict(deque)  # ip -> deque[timestamps]
-
-def rate_limit(next_handler):
-    def wrapped(request):
-        ip = request.get("ip", "local")
-        now = time.time()
-        window = 60.0
-        q = _requests[ip]
-
-        # evict old timestamps
-        while q and now - q[0] > window:
-            q.popleft()
-
-        if len(q) >= RATE_LIMIT_PER_MIN:
-            return ({"error": "rate limit exceeded", "limit_per_min": RATE_LIMIT_PER_MIN}, 429)
-
-        q.append(now)
-        return next_handler(request)
-    return wrapped
-
-# apply logging & rate limit
-def logger(next_handler):
-    def wrapped(request):
-        print(f"[LOG] {request['method']} {request['path']}")
-        return next_handler(request)
-    return wrapped
-
-app.use(rate_limit)
-app.use(logger)
-
-# ---------- wrap protected endpoints with auth middleware ----------
-app.routes["/me"]["GET"]                      = auth_required(app.routes["/me"]["GET"])
-app.routes["/todos"]["GET"]                   = auth_required(app.routes["/todos"]["GET"])
-app.routes["/todos"]["POST"]                  = auth_required(app.routes["/todos"]["POST"])
-app.routes["/todos/:id/toggle"]["PATCH"]      = auth_required(app.routes["/todos/:id/toggle"]["PATCH"])
-app.routes["/todos/:id"]["DELETE"]            = auth_required(app.routes["/todos/:id"]["DELETE"])
+# ---------- global middleware ----------
+# (access logging is built into App: see ACCESS_LOG* in backend/config.py)
+app.use(rate_limit(global_limiter, error={"error": "rate limit exceeded", "limit_per_min": RATE_LIMIT_PER_MIN}))
 
 # ---------- start ----------
 if __name__ == "__main__":
-    from backend.config import HOST, PORT, CORS_ALLOW_ORIGIN
-    app.run(host=HOST, port=PORT, allow_origin=CORS_ALLOW_ORIGIN)
+    from backend.config import (HOST, PORT, CORS_ALLOW_ORIGIN, SERVER_MODE, WORKERS, THREADS, BACKLOG,
+                                KEEPALIVE_TIMEOUT, KEEPALIVE_MAX_REQUESTS)
+    app.run(host=HOST, port=PORT, allow_origin=CORS_ALLOW_ORIGIN,
+            mode=SERVER_MODE, workers=WORKERS, threads=THREADS, backlog=BACKLOG,
+            keepalive_timeout=KEEPALIVE_TIMEOUT, keepalive_max_requests=KEEPALIVE_MAX_REQUESTS)
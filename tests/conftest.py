@@ -0,0 +1,69 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+# tests import the framework as `backend`, like the example app does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def serve_app():
+    """serve_app(app) -> base URL of `app` served by the threaded engine on a free port."""
+    from backend.server import make_server
+    servers = []
+
+    def start(app, threads=4):
+        app.freeze()
+        srv = make_server(app._handler_class(), "127.0.0.1", 0, threads=threads)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return "http://%s:%d" % srv.server_address
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+@pytest.fixture
+def serve_async_app():
+    """serve_async_app(app) -> (base URL, stop) for `app` served by the asyncio engine on a free port."""
+    from backend.aio import serve_async
+    from backend.app import cors_headers
+    stops = []
+
+    def start(app, threads=4, grace=10.0):
+        app.freeze("async")
+        listening = threading.Event()
+        state = {}
+
+        async def main():
+            state["loop"] = asyncio.get_running_loop()
+            state["stopping"] = asyncio.Event()
+
+            def ready(address):
+                state["address"] = address
+                listening.set()
+            await serve_async(app, "127.0.0.1", 0, cors_headers("*"), threads=threads, grace=grace,
+                              stopping=state["stopping"], ready=ready)
+
+        thread = threading.Thread(target=asyncio.run, args=(main(),), daemon=True)
+        thread.start()
+        assert listening.wait(5)
+
+        def stop(wait=True):
+            state["loop"].call_soon_threadsafe(state["stopping"].set)
+            if wait:
+                thread.join(15)
+        stops.append(stop)
+        return "http://%s:%d" % state["address"], stop
+
+    yield start
+    for stop in stops:
+        try:
+            stop()
+        except RuntimeError:
+            pass  # loop already closed
@@ -0,0 +1,87 @@
+import json
+import os
+import queue
+import threading
+
+import pytest
+
+from backend.accesslog import AccessLog
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_json_records(tmp_path):
+    path = str(tmp_path / "access.log")
+    log = AccessLog(path)
+    log.access("GET", "/todos", 200, 1.234, 56, user_id=7, ip="10.0.0.1")
+    log.error("Traceback...\n")
+    log.close()
+    access, error = [json.loads(line) for line in _lines(path)]
+    assert {k: access[k] for k in ("method", "path", "status", "ms", "bytes", "user", "ip")} == {
+        "method": "GET", "path": "/todos", "status": 200, "ms": 1.23, "bytes": 56, "user": 7, "ip": "10.0.0.1"}
+    assert error["level"] == "error" and error["message"] == "Traceback..."
+    assert log.stats()["written"] == 2
+
+
+def test_text_records(tmp_path):
+    path = str(tmp_path / "access.log")
+    log = AccessLog(path, fmt="text")
+    log.access("POST", "/auth/login", 401, 2.5, 30, ip="10.0.0.1")
+    log.error("boom")
+    log.close()
+    assert _lines(path) == ["10.0.0.1 POST /auth/login 401 30B 2.5ms user=-", "[ERROR] boom"]
+
+
+def test_unknown_format_is_refused():
+    with pytest.raises(ValueError):
+        AccessLog(None, fmt="xml")
+
+
+def test_sampling_always_keeps_5xx(tmp_path):
+    path = str(tmp_path / "access.log")
+    log = AccessLog(path, sample=0.0)
+    for status in (200, 404, 500, 503):
+        log.access("GET", "/x", status, 1.0, 0)
+    log.error("still logged")
+    log.close()
+    assert [json.loads(line).get("status") for line in _lines(path)] == [500, 503, None]
+    assert log.stats()["sampled_out"] == 2
+
+
+def test_full_queue_drops_and_counts(monkeypatch):
+    log = AccessLog("-", queue_size=2)
+    # a stalled writer: the queue is never emptied
+    monkeypatch.setattr(log, "_start", lambda: log._queue)
+    log._queue, log._pid = queue.Queue(2), os.getpid()
+    for _ in range(5):
+        log.access("GET", "/x", 200, 1.0, 0)
+    assert log.stats() == {"written": 0, "dropped": 3, "sampled_out": 0, "queued": 2}
+
+
+def test_close_writes_out_everything_queued(tmp_path):
+    path = str(tmp_path / "access.log")
+    log = AccessLog(path, flush_interval=10, batch=7)
+    for i in range(1000):
+        log.access("GET", f"/items/{i}", 200, 1.0, 0)
+    log.close()
+    lines = _lines(path)
+    assert len(lines) == 1000 and json.loads(lines[-1])["path"] == "/items/999"
+    assert log.stats()["written"] == 1000
+    log.close()  # a second close is harmless
+
+
+def test_counters_are_exact_under_concurrency():
+    log = AccessLog("-", sample=0.0)
+
+    def hammer():
+        for _ in range(20000):
+            log.access("GET", "/x", 200, 1.0, 0)
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert log.sampled_out == 160000
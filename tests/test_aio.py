@@ -0,0 +1,199 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from backend.accesslog import AccessLog
+from backend.aio import maybe_await
+from backend.app import App, Stream
+
+
+def _app(**kwargs):
+    return App(access_log=AccessLog(None), **kwargs)
+
+
+def _conn(base):
+    host, port = base.rsplit("/", 1)[1].split(":")
+    return http.client.HTTPConnection(host, int(port), timeout=5)
+
+
+def _get(base, path, method="GET", body=None, headers=None):
+    conn = _conn(base)
+    conn.request(method, path, body=body, headers=headers or {})
+    resp = conn.getresponse()
+    data = resp.read()
+    conn.close()
+    return resp, data
+
+
+def _raw(base, data):
+    host, port = base.rsplit("/", 1)[1].split(":")
+    with socket.create_connection((host, int(port)), timeout=5) as sock:
+        sock.sendall(data)
+        out = b""
+        while chunk := sock.recv(4096):
+            out += chunk
+    return out
+
+
+def test_async_handler_and_middleware(serve_async_app):
+    app = _app()
+    order = []
+
+    def outer(next_handler):
+        async def wrapped(request):
+            order.append("global")
+            request["seen"] = ["global"]
+            return await maybe_await(next_handler(request))
+        return wrapped
+
+    def inner(next_handler):
+        async def wrapped(request):
+            order.append("route")
+            request["seen"].append("route")
+            return await maybe_await(next_handler(request))
+        return wrapped
+
+    app.use(outer)
+
+    @app.route("/hello", methods=["GET"], middlewares=[inner])
+    async def hello(request):
+        await asyncio.sleep(0)
+        return {"seen": request["seen"], "thread": threading.current_thread().name}
+
+    base, _stop = serve_async_app(app)
+    resp, data = _get(base, "/hello")
+    body = json.loads(data)
+    assert resp.status == 200 and body["seen"] == ["global", "route"]
+    assert not body["thread"].startswith("pyreactx-async")  # ran on the loop thread
+    assert order == ["global", "route"]
+
+
+def test_sync_handler_runs_in_the_executor(serve_async_app):
+    app = _app()
+
+    @app.route("/sync", methods=["POST"])
+    def sync(request):
+        return {"thread": threading.current_thread().name, "json": request["json"]}, 201
+
+    base, _stop = serve_async_app(app)
+    resp, data = _get(base, "/sync", "POST", body=b'{"a": 1}')
+    body = json.loads(data)
+    assert resp.status == 201 and body["json"] == {"a": 1}
+    assert body["thread"].startswith("pyreactx-async")
+
+
+def test_status_without_a_standard_phrase(serve_async_app):
+    app = _app()
+    app.route("/odd")(lambda request: ({"x": 1}, 299))
+    base, _stop = serve_async_app(app)
+    resp, data = _get(base, "/odd")
+    assert resp.status == 299 and json.loads(data) == {"x": 1}
+
+
+def test_keep_alive_reuses_the_connection(serve_async_app):
+    app = _app()
+    app.route("/hello")(lambda request: {"ok": True})
+    base, _stop = serve_async_app(app)
+    conn = _conn(base)
+    conn.request("GET", "/hello")
+    resp = conn.getresponse()
+    assert json.loads(resp.read()) == {"ok": True}
+    assert resp.getheader("Keep-Alive", "").startswith("timeout=")
+    sock = conn.sock
+    conn.request("GET", "/hello")
+    resp = conn.getresponse()
+    assert resp.status == 200 and json.loads(resp.read()) == {"ok": True}
+    assert conn.sock is sock  # same socket, no reconnect
+    conn.close()
+
+
+def test_oversized_body_gets_413_and_close(serve_async_app):
+    app = _app(max_body_size=16)
+    app.route("/echo", methods=["POST"])(lambda request: request["json"])
+    base, _stop = serve_async_app(app)
+    out = _raw(base, b"POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: 100000000\r\n\r\n")
+    head, _, body = out.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 413") and b"Connection: close" in head
+    assert json.loads(body) == {"error": "Request body too large", "max_bytes": 16}
+
+
+@pytest.mark.parametrize("length", [b"abc", b"-1"])
+def test_bad_content_length_gets_400_and_close(serve_async_app, length):
+    app = _app()
+    app.route("/echo", methods=["POST"])(lambda request: request["json"])
+    base, _stop = serve_async_app(app)
+    out = _raw(base, b"POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: " + length + b"\r\n\r\n{}")
+    head, _, body = out.partition(b"\r\n\r\n")
+    assert head.startswith(b"HTTP/1.1 400") and b"Connection: close" in head
+    assert json.loads(body) == {"error": "Bad Content-Length"}
+
+
+def test_chunked_streaming(serve_async_app):
+    app = _app()
+
+    @app.route("/sync-stream")
+    def sync_stream(request):
+        return Stream(({"n": i} for i in range(3)), headers={"X-Kind": "sync"})
+
+    @app.route("/async-stream")
+    async def async_stream(request):
+        async def rows():
+            for i in range(3):
+                await asyncio.sleep(0)
+                yield {"n": i}
+        return rows()
+
+    base, _stop = serve_async_app(app)
+    for path in ("/sync-stream", "/async-stream"):
+        conn = _conn(base)
+        conn.request("GET", path)
+        resp = conn.getresponse()
+        assert resp.getheader("Transfer-Encoding") == "chunked" and resp.getheader("Content-Length") is None
+        assert resp.getheader("Content-Type") == "application/x-ndjson"
+        assert [json.loads(line) for line in resp.read().splitlines()] == [{"n": 0}, {"n": 1}, {"n": 2}]
+        conn.request("GET", path)  # the chunked body was framed, so the connection is reusable
+        assert conn.getresponse().status == 200
+        conn.close()
+
+
+def test_stop_drains_busy_and_closes_idle_connections(serve_async_app):
+    app = _app()
+    started = threading.Event()
+
+    @app.route("/slow")
+    def slow(request):
+        started.set()
+        time.sleep(0.5)
+        return {"done": True}
+
+    app.route("/hello")(lambda request: {"ok": True})
+    base, stop = serve_async_app(app, grace=5.0)
+
+    idle = _conn(base)
+    idle.request("GET", "/hello")
+    idle.getresponse().read()
+
+    result = {}
+
+    def call_slow():
+        resp, data = _get(base, "/slow")
+        result.update(status=resp.status, connection=resp.getheader("Connection"), body=json.loads(data))
+    caller = threading.Thread(target=call_slow)
+    caller.start()
+    assert started.wait(5)
+    stop(wait=False)
+
+    idle.sock.settimeout(5)
+    assert idle.sock.recv(1) == b""  # the idle keep-alive connection is hung up right away
+    idle.close()
+    caller.join(5)
+    assert result == {"status": 200, "connection": "close", "body": {"done": True}}
+    stop()
+    host, port = base.rsplit("/", 1)[1].split(":")
+    with pytest.raises(ConnectionRefusedError):
+        socket.create_connection((host, int(port)), timeout=1)
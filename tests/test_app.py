@@ -0,0 +1,213 @@
+import asyncio
+import http.client
+import json
+import urllib.request
+
+import pytest
+
+from backend.accesslog import AccessLog
+from backend.app import App, _ResponseCache
+
+
+def _cached_route(max_entries):
+    app = App(access_log=AccessLog(None))
+    calls = []
+
+    @app.route("/hello", methods=["GET"], cache="public, max-age=60")
+    def hello(request):
+        calls.append(request["query"])
+        return {"query": request["query"]}
+
+    response_cache = app.response_caches[("/hello", "GET")]
+    response_cache.max_entries = max_entries
+    return app, response_cache, response_cache.wrap(hello), calls
+
+
+def _get(handler, query=None, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return handler({"method": "GET", "path": "/hello", "query": query or {}, "headers": headers})
+
+
+def test_response_cache_answers_304_for_matching_etag():
+    _, _, handler, calls = _cached_route(_ResponseCache.max_entries)
+    first = _get(handler)
+    again = _get(handler, etag=first.headers["ETag"])
+    assert again.status == 304 and again.body == b"" and len(calls) == 1
+
+
+def test_response_cache_evicts_least_recently_used():
+    _, response_cache, handler, calls = _cached_route(3)
+    for x in range(3):
+        _get(handler, {"x": str(x)})
+    _get(handler, {"x": "0"})  # "0" is now the most recent
+    for x in range(3, 300):
+        _get(handler, {"x": str(x)})  # one-off query strings don't stop caching
+    assert len(response_cache.entries) == 3
+    calls.clear()
+    _get(handler, {"x": "299"})
+    assert calls == []  # still cached
+    _get(handler, {"x": "1"})
+    assert calls == [{"x": "1"}]  # evicted, computed again
+
+
+def test_new_path_is_cached_after_many_query_strings():
+    _, _, handler, calls = _cached_route(_ResponseCache.max_entries)
+    for x in range(_ResponseCache.max_entries + 10):
+        _get(handler, {"x": str(x)})
+    calls.clear()
+    etag = _get(handler).headers["ETag"]
+    assert _get(handler, etag=etag).status == 304 and len(calls) == 1
+
+
+def test_clear_response_cache():
+    app, response_cache, handler, calls = _cached_route(8)
+    _get(handler)
+    app.clear_response_cache("/hello")
+    assert not response_cache.entries
+    _get(handler)
+    assert len(calls) == 2
+
+
+@pytest.mark.parametrize("engine", ["threaded", "async"])
+def test_304_has_no_content_length_or_type(engine, serve_app, serve_async_app):
+    app, _, _, calls = _cached_route(8)
+    base = serve_app(app) if engine == "threaded" else serve_async_app(app)[0]
+    host, port = base.rsplit("/", 1)[1].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    conn.request("GET", "/hello")
+    resp = conn.getresponse()
+    resp.read()
+    etag = resp.getheader("ETag")
+    conn.request("GET", "/hello", headers={"If-None-Match": etag})
+    resp = conn.getresponse()
+    assert resp.status == 304 and resp.read() == b""
+    assert resp.getheader("Content-Length") is None and resp.getheader("Content-Type") is None
+    assert resp.getheader("ETag") == etag
+    conn.request("GET", "/hello")  # the connection is still framed correctly
+    assert conn.getresponse().status == 200
+    conn.close()
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("engine", ["threaded", "async"])
+def test_204_has_no_content_length(engine, serve_app, serve_async_app):
+    app = App(access_log=AccessLog(None))
+    app.route("/todos/:id", methods=["DELETE"])(lambda request: (None, 204))
+    base = serve_app(app) if engine == "threaded" else serve_async_app(app)[0]
+    host, port = base.rsplit("/", 1)[1].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    for method in ("OPTIONS", "DELETE"):
+        conn.request(method, "/todos/1")
+        resp = conn.getresponse()
+        assert resp.status == 204 and resp.read() == b""
+        assert resp.getheader("Content-Length") is None
+    assert resp.getheader("Access-Control-Allow-Origin") == "*"
+    conn.request("OPTIONS", "/todos/1")  # nothing stray left on the connection
+    assert conn.getresponse().status == 204
+    conn.close()
+
+
+# ---------- startup / shutdown hooks ----------
+
+def test_startup_hooks_run_once_in_order():
+    app = App(access_log=AccessLog(None))
+    calls = []
+    app.on_startup(lambda: calls.append("migrate"))
+
+    @app.on_startup
+    async def warm():
+        calls.append("warm")
+
+    app.startup()
+    app.startup()
+    assert calls == ["migrate", "warm"]
+
+
+def test_failing_startup_hook_stops_startup():
+    app = App(access_log=AccessLog(None))
+    calls = []
+
+    @app.on_startup
+    def broken():
+        raise RuntimeError("no database")
+
+    app.on_startup(lambda: calls.append("seed"))
+    with pytest.raises(RuntimeError):
+        app.startup()
+    assert calls == []
+
+
+def test_shutdown_hooks_run_in_reverse_order_despite_errors(capsys):
+    app = App(access_log=AccessLog(None))
+    calls = []
+    app.on_shutdown(lambda: calls.append("close db"))
+
+    @app.on_shutdown
+    def broken():
+        raise RuntimeError("boom")
+
+    app.on_shutdown(lambda: calls.append("flush"))
+    app.shutdown()
+    assert calls == []  # never started: nothing to undo
+    app.startup()
+    app.shutdown()
+    app.shutdown()
+    assert calls == ["flush", "close db"]
+    assert "RuntimeError: boom" in capsys.readouterr().err  # logged, not raised
+
+
+# ---------- middleware chains ----------
+
+def _tagging(name, order):
+    def middleware(next_handler):
+        def wrapped(request):
+            order.append(name)
+            return next_handler(request)
+        return wrapped
+    return middleware
+
+
+def _json(base, path):
+    with urllib.request.urlopen(base + path, timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+def test_route_middlewares_run_inside_global_ones():
+    app = App(access_log=AccessLog(None))
+    order = []
+    app.use(_tagging("g1", order))
+    app.use(_tagging("g2", order))
+    app.route("/x", middlewares=[_tagging("r1", order), _tagging("r2", order)])(
+        lambda request: order.append("handler") or "ok")
+    handler = app.routes["/x"]["GET"]
+    assert app._chain("/x", "GET", handler)({}) == "ok"
+    assert order == ["g1", "g2", "r1", "r2", "handler"]
+    assert app._chain("/x", "GET", handler) is app._chain("/x", "GET", handler)  # composed once
+
+
+def test_changes_after_freeze_take_effect(serve_app):
+    app = App(access_log=AccessLog(None))
+    order = []
+    app.route("/x")(lambda request: {"handler": "first"})
+    base = serve_app(app)  # frozen: chains are built
+    assert _json(base, "/x") == {"handler": "first"} and order == []
+
+    app.use(_tagging("late", order))
+    assert _json(base, "/x") == {"handler": "first"} and order == ["late"]
+
+    app.route("/y")(lambda request: {"handler": "new route"})
+    assert _json(base, "/y") == {"handler": "new route"} and order == ["late", "late"]
+
+    app.routes["/x"]["GET"] = lambda request: {"handler": "swapped"}
+    assert _json(base, "/x") == {"handler": "swapped"} and order == ["late"] * 3
+
+
+def test_chains_are_kept_per_engine():
+    app = App(access_log=AccessLog(None))
+    app.route("/x")(lambda request: "ok")
+    handler = app.routes["/x"]["GET"]
+    app.freeze()
+    app.freeze("async")
+    sync, async_ = app._chain("/x", "GET", handler), app._chain("/x", "GET", handler, "async")
+    assert sync({}) == "ok"
+    assert asyncio.run(async_({})) == "ok"  # the plain handler runs on the loop's executor
@@ -0,0 +1,178 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import jwt
+import pytest
+
+from backend import auth
+from backend.accesslog import AccessLog
+from backend.app import App
+from backend.config import THREADS
+from backend.server import make_server
+
+
+# ---------- password hashing pool ----------
+
+def test_admission_leaves_a_request_thread_free():
+    assert 1 <= auth.BCRYPT_MAX_JOBS <= max(1, THREADS - 1)
+
+
+def test_shutdown_password_pool_stops_its_threads():
+    assert auth._run_in_pool(lambda: 42) == 42
+    assert any(t.name.startswith("bcrypt") for t in threading.enumerate())
+    auth.shutdown_password_pool()
+    assert not any(t.name.startswith("bcrypt") for t in threading.enumerate())
+    assert auth._run_in_pool(lambda: 43) == 43  # a new pool starts on demand
+    auth.shutdown_password_pool()
+
+
+@pytest.fixture
+def login_server(monkeypatch):
+    """3 request threads, at most 2 hash jobs admitted, hashing blocked until `gate` is set."""
+    gate = threading.Event()
+    monkeypatch.setattr(auth, "_pw_slots", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(auth, "_checkpw", lambda password, hashed: gate.wait(10))
+
+    app = App(access_log=AccessLog(None))
+
+    @app.route("/login", methods=["POST"])
+    def login(request):
+        try:
+            return {"ok": auth.check_password("pw", b"hash")}
+        except auth.PasswordPoolBusy as e:
+            return ({"error": "busy"}, 503, {"Retry-After": str(e.retry_after)})
+
+    @app.route("/health")
+    def health(request):
+        return {"status": "ok"}
+
+    app.freeze()
+    srv = make_server(app._handler_class(), "127.0.0.1", 0, threads=3)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield "http://%s:%d" % srv.server_address, gate
+    gate.set()
+    srv.shutdown()
+    srv.server_close()
+
+
+def _call(url, method="GET"):
+    req = urllib.request.Request(url, method=method, data=b"{}" if method == "POST" else None)
+    try:
+        with urllib.request.urlopen(req, timeout=10) as resp:
+            return resp.status, dict(resp.headers), json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.loads(e.read())
+
+
+def test_saturated_pool_answers_503_and_health_stays_fast(login_server):
+    base, gate = login_server
+    admitted = []
+    threads = [threading.Thread(target=lambda: admitted.append(_call(base + "/login", "POST"))) for _ in range(2)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 5
+    while auth._pw_slots._value and time.monotonic() < deadline:  # both jobs admitted and waiting
+        time.sleep(0.01)
+
+    status, headers, body = _call(base + "/login", "POST")
+    assert status == 503 and headers["Retry-After"] == "1"
+
+    started = time.monotonic()
+    assert _call(base + "/health")[0] == 200
+    assert time.monotonic() - started < 1.0
+
+    gate.set()
+    for t in threads:
+        t.join(10)
+    assert [r[0] for r in admitted] == [200, 200]
+
+
+# ---------- verified-token cache ----------
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    monkeypatch.setattr(auth, "JWT_SECRET", "test-secret-" + "x" * 32)
+    monkeypatch.setattr(auth, "JWT_CACHE_SIZE", 100)
+    auth.clear_token_cache()
+    yield
+    auth.clear_token_cache()
+
+
+def _stats():
+    return auth.token_cache_stats()
+
+
+def test_verified_token_is_served_from_cache(token_cache):
+    token = auth.create_token(7, "a@b.c")
+    before = _stats()
+    assert auth.verify_token(token)["sub"] == 7
+    assert auth.verify_token(token)["sub"] == 7
+    after = _stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_cached_claims_are_copies(token_cache):
+    token = auth.create_token(7, "a@b.c")
+    auth.verify_token(token)["sub"] = 999
+    assert auth.verify_token(token)["sub"] == 7
+
+
+def test_cache_entry_is_dropped_once_expired(token_cache, monkeypatch):
+    token = auth.create_token(7, "a@b.c")
+    exp = jwt.decode(token, options={"verify_signature": False})["exp"]
+    auth.verify_token(token)
+    clock = type("Clock", (), {"time": staticmethod(lambda: exp + 1)})
+    monkeypatch.setattr(auth, "time", clock)  # the cache's clock only; jwt.decode keeps the real one
+    before = _stats()
+    auth.verify_token(token)
+    after = _stats()
+    assert after["hits"] == before["hits"]
+    assert after["evictions"] - before["evictions"] == 1
+
+
+def test_expired_token_is_rejected_and_not_cached(token_cache):
+    now = int(time.time())
+    token = jwt.encode({"sub": 7, "iat": now - 100, "exp": now - 10}, auth.JWT_SECRET, algorithm=auth.JWT_ALG)
+    assert auth.verify_token(token) is None
+    assert auth.verify_token(token) is None
+    assert _stats()["size"] == 0
+
+
+def test_tampered_token_is_rejected_even_when_original_is_cached(token_cache):
+    token = auth.create_token(7, "a@b.c")
+    assert auth.verify_token(token) is not None
+    header, payload, signature = token.split(".")
+    flipped = signature[:-2] + ("A" if signature[-2] != "A" else "B") + signature[-1]
+    assert auth.verify_token(".".join((header, payload, flipped))) is None
+    forged = jwt.encode({"sub": 1, "exp": int(time.time()) + 60}, "some-other-secret-" + "y" * 32,
+                        algorithm=auth.JWT_ALG)
+    assert auth.verify_token(".".join((header, forged.split(".")[1], signature))) is None
+    assert _stats()["size"] == 1
+
+
+def test_secret_rotation_invalidates_cached_tokens(token_cache, monkeypatch):
+    token = auth.create_token(7, "a@b.c")
+    assert auth.verify_token(token) is not None
+    monkeypatch.setattr(auth, "JWT_SECRET", "rotated-secret-" + "z" * 32)
+    assert auth.verify_token(token) is None
+    assert auth.verify_token(auth.create_token(7, "a@b.c"))["sub"] == 7
+
+
+def test_cache_is_bounded_lru(token_cache, monkeypatch):
+    monkeypatch.setattr(auth, "JWT_CACHE_SIZE", 3)
+    tokens = [auth.create_token(i, f"u{i}@b.c") for i in range(5)]
+    for t in tokens[:3]:
+        auth.verify_token(t)
+    auth.verify_token(tokens[0])  # most recently used: survives the next two inserts
+    for t in tokens[3:]:
+        auth.verify_token(t)
+    assert _stats()["size"] == 3
+    before = _stats()
+    auth.verify_token(tokens[0])
+    assert _stats()["hits"] - before["hits"] == 1
+    auth.verify_token(tokens[1])  # evicted: verified again
+    assert _stats()["misses"] - before["misses"] == 1
@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend import cache, simpledb
+from backend.cache import MemoryVersions, OwnerCache, SQLiteVersions, make_versions
+
+
+class Loader:
+    def __init__(self, value="v"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_hit_after_load():
+    c = OwnerCache("t")
+    load = Loader({"items": [1, 2]})
+    assert c.get_or_load(1, "page", load) == {"items": [1, 2]}
+    assert c.get_or_load(1, "page", load) == {"items": [1, 2]}
+    assert load.calls == 1
+    assert c.get_or_load(2, "page", load) and load.calls == 2  # other owner, own entry
+
+
+def test_invalidate_drops_only_that_owner():
+    c = OwnerCache("t")
+    a, b = Loader(), Loader()
+    c.get_or_load(1, "page", a)
+    c.get_or_load(2, "page", b)
+    c.invalidate(1)
+    c.get_or_load(1, "page", a)
+    c.get_or_load(2, "page", b)
+    assert (a.calls, b.calls) == (2, 1)
+
+
+def test_version_bump_from_another_worker(tmp_path):
+    db = str(tmp_path / "versions.db")
+    mine, theirs = SQLiteVersions(db), SQLiteVersions(db)  # same table, as two prefork workers see it
+    c = OwnerCache("t", mine)
+    load = Loader()
+    c.get_or_load(1, "page", load)
+    c.get_or_load(1, "page", load)
+    assert load.calls == 1
+    theirs.bump(1)  # a write handled by the other worker
+    c.get_or_load(1, "page", load)
+    assert load.calls == 2
+    assert mine.current(1) == theirs.current(1) == 1
+    simpledb.close_all()
+
+
+def test_memory_versions_are_per_process():
+    versions = make_versions("memory")
+    assert isinstance(versions, MemoryVersions) and versions.current("u") == 0
+    versions.bump("u")
+    assert versions.current("u") == 1
+    with pytest.raises(ValueError):
+        make_versions("redis")
+
+
+def test_lru_eviction_by_max_bytes():
+    value = "x" * 50  # 52 bytes of JSON + 100 overhead = 152 per entry
+    c = OwnerCache("t", max_bytes=400)
+    loads = {k: Loader(value) for k in "abc"}
+    c.get_or_load(1, "a", loads["a"])
+    c.get_or_load(1, "b", loads["b"])
+    c.get_or_load(1, "a", loads["a"])  # "a" is now the most recent
+    c.get_or_load(1, "c", loads["c"])  # over 400 bytes: "b" goes
+    assert len(c) == 2 and c.size == 304
+    c.get_or_load(1, "a", loads["a"])
+    c.get_or_load(1, "b", loads["b"])
+    assert (loads["a"].calls, loads["b"].calls) == (1, 2)
+
+
+def test_value_bigger_than_the_cache_is_not_stored():
+    c = OwnerCache("t", max_bytes=120)
+    load = Loader("x" * 100)
+    c.get_or_load(1, "big", load)
+    c.get_or_load(1, "big", load)
+    assert load.calls == 2 and len(c) == 0 and c.size == 0
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = SimpleNamespace(monotonic=lambda: 100.0)
+    monkeypatch.setattr(cache, "time", clock)
+    c = OwnerCache("t", ttl=5)
+    load = Loader()
+    c.get_or_load(1, "page", load)
+    clock.monotonic = lambda: 104.9
+    c.get_or_load(1, "page", load)
+    assert load.calls == 1
+    clock.monotonic = lambda: 105.1
+    c.get_or_load(1, "page", load)
+    assert load.calls == 2
@@ -0,0 +1,140 @@
+import gzip
+import http.client
+import json
+
+import pytest
+
+from backend import compress
+from backend.accesslog import AccessLog
+from backend.app import App, Response
+from backend.compress import add_vary, base_etag, negotiate, variant_etag
+
+
+@pytest.fixture
+def gzip_only(monkeypatch):
+    monkeypatch.delitem(compress.ENCODERS, "br", raising=False)
+
+
+@pytest.fixture
+def with_br(monkeypatch):
+    monkeypatch.setitem(compress.ENCODERS, "br", lambda data: b"br:" + data)
+
+
+# ---------- negotiate ----------
+
+def test_negotiate_without_a_usable_encoding(gzip_only):
+    for header in (None, "", "identity", "deflate", "gzip;q=0", "GZIP; q=0.0", "gzip;q=oops", "*;q=0"):
+        assert negotiate(header) is None, header
+
+
+def test_negotiate_q_values(gzip_only):
+    assert negotiate("gzip") == "gzip"
+    assert negotiate("deflate, GZip;q=0.2") == "gzip"
+    assert negotiate("*") == "gzip"
+    assert negotiate("gzip;q=0, *;q=1") is None  # an explicit refusal beats the wildcard
+
+
+def test_negotiate_prefers_brotli_unless_weighted_lower(with_br):
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("br;q=0.1, gzip;q=0.9") == "gzip"
+    assert negotiate("br;q=0, *") == "gzip"
+    assert negotiate("*") == "br"
+
+
+# ---------- ETags and Vary ----------
+
+def test_variant_etag_round_trip():
+    assert variant_etag('"abc"', "gzip") == '"abc-gzip"'
+    assert base_etag('"abc-gzip"') == base_etag('"abc-br"') == base_etag('"abc"') == '"abc"'
+    assert base_etag('"abc-zstd"') == '"abc-zstd"'  # not one of ours
+
+
+def test_add_vary_merges():
+    headers = {}
+    add_vary(headers)
+    assert headers == {"Vary": "Accept-Encoding"}
+    headers = {"Vary": "Origin"}
+    add_vary(headers)
+    assert headers["Vary"] == "Origin, Accept-Encoding"
+    headers = {"Vary": "origin, accept-encoding"}
+    add_vary(headers)
+    assert headers["Vary"] == "origin, accept-encoding"
+
+
+# ---------- App._render ----------
+
+def test_render_compresses_from_the_size_threshold(gzip_only):
+    app = App(access_log=AccessLog(None), compress_min_size=100)
+    small = {"x": "a" * 10}
+    status, data, headers = app._render(small, 200, None, "gzip")
+    assert json.loads(data) == small and "Content-Encoding" not in headers
+    assert headers["Vary"] == "Accept-Encoding"  # the answer would differ for a bigger body
+
+    big = {"x": "a" * 500}
+    status, data, headers = app._render(big, 200, {"Vary": "Origin"}, "gzip")
+    assert headers["Content-Encoding"] == "gzip" and json.loads(gzip.decompress(data)) == big
+    assert headers["Vary"] == "Origin, Accept-Encoding"
+
+    assert "Content-Encoding" not in app._render(big, 200, None, "gzip;q=0")[2]
+    assert "Content-Encoding" not in app._render(big, 200, None, None)[2]
+
+
+def test_render_skips_incompressible_and_disabled(gzip_only):
+    app = App(access_log=AccessLog(None), compress_min_size=10)
+    png = Response(b"\x89PNG" + b"\0" * 500, content_type="image/png")
+    _, data, headers = app._render(png, 200, None, "gzip")
+    assert data == png.body and "Content-Encoding" not in headers and "Vary" not in headers
+
+    off = App(access_log=AccessLog(None), compress_min_size=None)
+    assert "Content-Encoding" not in off._render({"x": "a" * 5000}, 200, None, "gzip")[2]
+
+
+# ---------- cached routes: per-encoding ETags ----------
+
+def _cached_app():
+    app = App(access_log=AccessLog(None), compress_min_size=100)
+    calls = []
+
+    @app.route("/big", cache="public, max-age=60")
+    def big(request):
+        calls.append(1)
+        return {"x": "a" * 500}
+
+    handler = app.response_caches[("/big", "GET")].wrap(big)
+    return handler, calls
+
+
+def _get(handler, headers):
+    return handler({"method": "GET", "path": "/big", "query": {}, "headers": headers})
+
+
+def test_each_encoding_gets_its_own_etag_and_304s_for_any_of_them(gzip_only):
+    handler, calls = _cached_app()
+    plain = _get(handler, {})
+    zipped = _get(handler, {"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["ETag"] == variant_etag(plain.headers["ETag"], "gzip")
+    assert gzip.decompress(zipped.body) == plain.body
+
+    for inm in (zipped.headers["ETag"], "W/" + zipped.headers["ETag"], plain.headers["ETag"]):
+        not_modified = _get(handler, {"Accept-Encoding": "gzip", "If-None-Match": inm})
+        assert not_modified.status == 304 and not_modified.headers["ETag"] == zipped.headers["ETag"]
+    # the identity client's ETag is reported back as the identity one
+    assert _get(handler, {"If-None-Match": zipped.headers["ETag"]}).headers["ETag"] == plain.headers["ETag"]
+    assert _get(handler, {"If-None-Match": '"other", "nope-gzip"'}).status == 200
+    assert len(calls) == 1
+
+
+def test_gzip_over_the_wire(gzip_only, serve_app):
+    app = App(access_log=AccessLog(None), compress_min_size=100)
+    app.route("/big")(lambda request: {"x": "a" * 500})
+    base = serve_app(app)
+    host, port = base.rsplit("/", 1)[1].split(":")
+    conn = http.client.HTTPConnection(host, int(port), timeout=5)
+    conn.request("GET", "/big", headers={"Accept-Encoding": "gzip"})
+    resp = conn.getresponse()
+    body = resp.read()
+    assert resp.getheader("Content-Encoding") == "gzip" and resp.getheader("Vary") == "Accept-Encoding"
+    assert int(resp.getheader("Content-Length")) == len(body)
+    assert json.loads(gzip.decompress(body)) == {"x": "a" * 500}
+    conn.close()
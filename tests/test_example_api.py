@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend import simpledb
+from backend.migrations import migrate
+from examples.hello_world.backend import main
+
+
+@pytest.fixture
+def user(tmp_path, monkeypatch):
+    """A user in a fresh database; handlers are called directly, past auth_required."""
+    monkeypatch.setattr(simpledb, "DB_PATH", str(tmp_path / "api.db"))
+    migrate(main.MIGRATIONS)
+    uid = simpledb.exec_insert("INSERT INTO users(email, password_hash) VALUES (?, ?)", ("t@example.com", b"-"))
+    if main.todo_cache is not None:
+        main.todo_cache.clear()
+    yield {"id": uid, "email": "t@example.com"}
+    simpledb.close_all()
+
+
+def _todos(user):
+    return simpledb.query_all("SELECT id, title, done FROM todos WHERE user_id=? ORDER BY id", (user["id"],))
+
+
+def test_create_rejects_non_string_title(user):
+    assert main.create_todo({"user": user, "json": {"title": 5}}) == ({"error": "title must be a string"}, 400)
+    assert main.create_todo({"user": user, "json": ["x"]}) == ({"error": "invalid JSON body"}, 400)
+    assert main.create_todo({"user": user, "json": {"title": "  "}}) == ({"error": "title is required"}, 400)
+    item, status = main.create_todo({"user": user, "json": {"title": " buy milk "}})
+    assert status == 201 and item["title"] == "buy milk"
+
+
+def test_batch_reports_bad_titles_per_item(user):
+    result = main.batch_todos({"user": user, "json": {"create": [{"title": 5}, {"title": "ok"}, "nope", {}]}})
+    assert [r["ok"] for r in result["create"]] == [False, True, False, False]
+    assert result["create"][0]["error"] == "title must be a string"
+    assert result["create"][2]["error"] == "title is required"
+    assert [t["title"] for t in _todos(user)] == ["ok"]  # the valid item was not rolled back
+
+
+def test_batch_ids_must_not_be_booleans(user):
+    first = main.create_todo({"user": user, "json": {"title": "a"}})[0]
+    assert first["id"] == 1  # so `true` would have meant this todo
+    result = main.batch_todos({"user": user, "json": {"toggle": [True], "delete": [False, True]}})
+    assert [r["ok"] for r in result["toggle"] + result["delete"]] == [False, False, False]
+    assert _todos(user) == [{"id": 1, "title": "a", "done": 0}]
+
+    result = main.batch_todos({"user": user, "json": {"toggle": [1]}})
+    assert result["toggle"][0]["ok"] and result["toggle"][0]["item"]["done"] is True
+
+
+def _titles(user):
+    return [t["title"] for t in main.list_todos({"user": user, "query": {}})["items"]]
+
+
+@pytest.mark.skipif(main.todo_cache is None, reason="TODO_CACHE_BYTES=0")
+def test_writes_invalidate_the_cached_list(user):
+    assert _titles(user) == []
+    assert len(main.todo_cache) == 2  # the page and the total
+    main.create_todo({"user": user, "json": {"title": "a"}})
+    assert _titles(user) == ["a"]
+    main.batch_todos({"user": user, "json": {"create": [{"title": "b"}], "delete": [1]}})
+    assert _titles(user) == ["b"]
+    assert main.list_todos({"user": user, "query": {}})["total"] == 1
+
+    loads = len(main.todo_cache)
+    main.batch_todos({"user": user, "json": {"toggle": [999]}})  # nothing changed: cache kept
+    assert len(main.todo_cache) == loads
+
+
+def _page(user, **query):
+    return main.list_todos({"user": user, "query": {k: str(v) for k, v in query.items()}})
+
+
+def test_keyset_paging_walks_every_todo_once(user):
+    for title in "abcde":
+        main.create_todo({"user": user, "json": {"title": title}})
+    first = _page(user, limit=2)
+    assert [t["title"] for t in first["items"]] == ["e", "d"] and first["next_cursor"] == 4
+
+    seen, cursor = [t["id"] for t in first["items"]], first["next_cursor"]
+    while cursor is not None:
+        page = _page(user, after=cursor, limit=2)
+        assert "total" not in page and "page" not in page  # keyset: no COUNT(*) unless asked
+        seen += [t["id"] for t in page["items"]]
+        cursor = page["next_cursor"]
+    assert seen == [5, 4, 3, 2, 1]
+    assert page["items"] == [{"id": 1, "title": "a", "done": False}]  # last page: next_cursor is null
+
+    assert _page(user, after=4, limit=2, total=1)["total"] == 5
+    assert _page(user, after=1)["items"] == [] and _page(user, after=1)["next_cursor"] is None
+
+
+def test_offset_paging_still_works(user):
+    for title in "abcde":
+        main.create_todo({"user": user, "json": {"title": title}})
+    page = _page(user, page=2, limit=2)
+    assert [t["id"] for t in page["items"]] == [3, 2]
+    assert (page["page"], page["limit"], page["total"], page["next_cursor"]) == (2, 2, 5, 2)
+    last = _page(user, page=3, limit=2)
+    assert [t["id"] for t in last["items"]] == [1] and last["next_cursor"] is None
+    assert "total" not in _page(user, page=1, total=0)
+    assert _page(user, limit=500)["limit"] == 50
+    assert _page(user, after="x") == ({"error": "bad pagination params"}, 400)
+
+
+def test_metrics_endpoint_is_opt_in():
+    assert main.METRICS_TOKEN or "/metrics" not in main.app.routes
+
+
+def test_metrics_guard_needs_the_token(monkeypatch):
+    monkeypatch.setattr(main, "METRICS_TOKEN", "s3cret")
+    handler = main.metrics_token_required(lambda request: "ok")
+
+    def request(auth):
+        return SimpleNamespace(header=lambda name: auth if name == "Authorization" else None)
+
+    assert handler(request(None)) == ({"error": "unauthorized"}, 401)
+    assert handler(request("Bearer nope")) == ({"error": "unauthorized"}, 401)
+    assert handler(request("Bearer s3cret")) == "ok"
@@ -0,0 +1,43 @@
+import os
+
+from backend.metrics import Registry
+
+
+def _registry():
+    registry = Registry(buckets=(0.1, 1.0))
+    registry.enabled = True
+    return registry
+
+
+def test_render_counters_and_histograms():
+    registry = _registry()
+    registry.describe("hits_total", "counter", "Hits")
+    registry.inc("hits_total", (("route", "/a"),))
+    registry.inc("hits_total", (("route", "/a"),), 2)
+    registry.observe("latency_seconds", (("route", "/a"),), 0.5)
+    text = registry.render()
+    assert "# HELP hits_total Hits\n# TYPE hits_total counter\n" in text
+    assert 'hits_total{route="/a"} 3\n' in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 0\n' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 1\n' in text
+    assert "pid=" not in text  # one process: no need to tell series apart
+
+
+def test_forked_worker_labels_its_series_with_its_pid():
+    registry = _registry()
+    registry.inc("hits_total", (("route", "/a"),))
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            registry.inc("hits_total", (("route", "/a"),), 5)
+            os.write(write_fd, registry.render().encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        child_text = f.read()
+    os.waitpid(pid, 0)
+    # the worker starts from zero and says which process it is
+    assert f'hits_total{{pid="{pid}",route="/a"}} 5\n' in child_text
+    assert 'hits_total{route="/a"} 1\n' in registry.render()
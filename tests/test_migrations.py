@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from backend import simpledb
+from backend.migrations import applied, migrate
+
+MIGRATIONS = [
+    (2, "add done", "ALTER TABLE items ADD COLUMN done INTEGER NOT NULL DEFAULT 0"),
+    (1, "create items", ["CREATE TABLE items (id INTEGER PRIMARY KEY, title TEXT)",
+                         "CREATE INDEX idx_items_title ON items(title)"]),
+    (3, "seed", lambda conn: conn.execute("INSERT INTO items(title) VALUES ('first')")),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    yield str(tmp_path / "migrations.db")
+    simpledb.close_all()
+
+
+def _columns(db, table):
+    return [r["name"] for r in simpledb.query_all(f"PRAGMA table_info({table})", db_path=db)]
+
+
+def test_applies_in_version_order_once(db):
+    assert migrate(MIGRATIONS, db) == [1, 2, 3]
+    assert _columns(db, "items") == ["id", "title", "done"]
+    assert simpledb.query_all("SELECT title, done FROM items", db_path=db) == [{"title": "first", "done": 0}]
+    assert applied(db) == {1, 2, 3}
+    assert migrate(MIGRATIONS, db) == []  # current schema: nothing runs again
+    assert simpledb.query_one("SELECT COUNT(*) AS n FROM items", db_path=db)["n"] == 1
+
+
+def test_only_new_versions_run(db):
+    assert migrate(MIGRATIONS[1:2], db) == [1]
+    assert migrate(MIGRATIONS, db) == [2, 3]
+
+
+def test_duplicate_versions_are_refused(db):
+    with pytest.raises(ValueError, match="duplicate"):
+        migrate([(1, "a", "SELECT 1"), (1, "b", "SELECT 2")], db)
+    assert applied(db) == set()  # checked before anything runs
+
+
+def test_failing_step_is_rolled_back_and_not_recorded(db):
+    broken = MIGRATIONS[:2] + [(3, "broken", ["CREATE TABLE tags (name TEXT)", "INSERT INTO nope VALUES (1)"])]
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(broken, db)
+    assert applied(db) == {1, 2}  # the earlier migrations stay
+    tables = {r["name"] for r in simpledb.query_all("SELECT name FROM sqlite_master WHERE type='table'", db_path=db)}
+    assert "tags" not in tables  # the half-done step left nothing behind
+    assert migrate(MIGRATIONS, db) == [3]
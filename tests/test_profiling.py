@@ -0,0 +1,121 @@
+import json
+import os
+import pstats
+import threading
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from backend import simpledb
+from backend.accesslog import AccessLog
+from backend.app import App
+from backend.profiling import Profiler
+
+# ~50ms of SQLite work: long enough for the sampler to catch it running
+SLOW_SQL = ("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 300000) "
+            "SELECT COUNT(*) AS n FROM c")
+
+
+def _request(**headers):
+    return SimpleNamespace(header=lambda name: headers.get(name))
+
+
+def _files(path):
+    return sorted(os.listdir(path))
+
+
+@pytest.fixture
+def db(tmp_path):
+    yield str(tmp_path / "profiled.db")
+    simpledb.close_all()
+
+
+def test_token_header_triggers_profiling(tmp_path):
+    profiler = Profiler("sample", str(tmp_path), token="s3cret")
+    assert profiler.wants(_request(**{"X-Profile": "s3cret"}))
+    assert not profiler.wants(_request(**{"X-Profile": "guess"}))
+    assert not profiler.wants(_request())
+    sampled = Profiler("sample", str(tmp_path), token="s3cret", sample=1.0)
+    assert sampled.wants(_request())
+    assert not sampled.wants(_request(**{"X-Profile": "guess"}))  # a wrong token is never profiled
+    assert not Profiler("sample", str(tmp_path)).wants(_request(**{"X-Profile": ""}))
+
+
+def test_only_requests_with_the_token_are_profiled(tmp_path, serve_app):
+    out = tmp_path / "profiles"
+    app = App(access_log=AccessLog(None), profiler=Profiler("sample", str(out), token="s3cret"))
+    app.route("/todos/:id")(lambda request: {"id": request["params"]["id"]})
+    base = serve_app(app)
+
+    def get(token=None):
+        headers = {"X-Profile": token} if token else {}
+        with urllib.request.urlopen(urllib.request.Request(base + "/todos/1", headers=headers), timeout=5) as r:
+            return json.loads(r.read())
+
+    assert get() == get("wrong") == {"id": "1"}
+    assert _files(out) == [] and app.profiler.profiled == 0
+    assert get("s3cret") == {"id": "1"}
+    assert _files(out) == ["GET_todos_id.folded", "GET_todos_id.sql.jsonl"]
+    assert app.profiler.profiled == 1
+
+
+def test_sample_mode_writes_folded_stacks_with_sql(tmp_path, db):
+    profiler = Profiler("sample", str(tmp_path), interval=0.001)
+
+    def list_things():
+        return simpledb.query_one(SLOW_SQL, db_path=db)
+
+    assert profiler.run("/things", "GET", list_things) == {"n": 300000}
+    folded = (tmp_path / "GET_things.folded").read_text().splitlines()
+    assert folded and all(line.startswith("GET /things;") for line in folded)
+    assert any("list_things (test_profiling.py" in line for line in folded)
+    # the statement running when the stack was taken is the last frame
+    assert any(";SQL WITH RECURSIVE c(x) AS (SELECT ? UNION ALL" in line for line in folded)
+    assert all(int(line.rsplit(" ", 1)[1]) >= 1 for line in folded)  # "<stack> <samples>"
+
+    (record,) = [json.loads(line) for line in (tmp_path / "GET_things.sql.jsonl").read_text().splitlines()]
+    (sql, ms), = record["statements"]
+    assert sql.startswith("WITH RECURSIVE") and "300000" not in sql and ms > 0
+    assert record["ms"] >= ms and "profile" not in record
+
+
+def test_cprofile_mode_writes_a_prof_per_request(tmp_path, db):
+    profiler = Profiler("cprofile", str(tmp_path))
+
+    def list_things():
+        return simpledb.query_one("SELECT 1 AS one", db_path=db)
+
+    assert profiler.run("/things", "GET", list_things) == {"one": 1}
+    (prof,) = [name for name in _files(tmp_path) if name.endswith(".prof")]
+    assert prof.startswith("GET_things-") and prof.endswith(f"-{os.getpid()}.prof")
+    functions = {func for _file, _line, func in pstats.Stats(str(tmp_path / prof)).stats}
+    assert "list_things" in functions
+    (record,) = [json.loads(line) for line in (tmp_path / "GET_things.sql.jsonl").read_text().splitlines()]
+    assert record["profile"] == prof and record["statements"][0][0] == "SELECT ? AS one"
+
+
+def test_concurrent_request_runs_unprofiled(tmp_path):
+    profiler = Profiler("cprofile", str(tmp_path))
+    inside, release = threading.Event(), threading.Event()
+
+    def slow():
+        inside.set()
+        release.wait(5)
+        return "first"
+
+    first = threading.Thread(target=lambda: profiler.run("/slow", "GET", slow))
+    first.start()
+    assert inside.wait(5)
+    assert profiler.run("/fast", "GET", lambda: "second") == "second"  # didn't wait, wasn't profiled
+    release.set()
+    first.join(5)
+    assert profiler.profiled == 1
+    assert not any(name.startswith("GET_fast") for name in _files(tmp_path))
+    assert profiler.run("/fast", "GET", lambda: "third") == "third"  # free again
+    assert profiler.profiled == 2
+
+
+def test_unknown_kind_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        Profiler("perf", str(tmp_path))
@@ -0,0 +1,190 @@
+import asyncio
+import threading
+import time
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from backend import ratelimit
+from backend.accesslog import AccessLog
+from backend.app import App
+from backend.ratelimit import (MemoryBackend, RateLimiter, SlidingWindowCounter, SQLiteBackend, TokenBucket,
+                               rate_limit)
+
+
+def _run(algorithm, times):
+    """-> [(allowed, retry)] stepping one key through `times`"""
+    out = []
+    state = algorithm.initial(times[0])
+    for now in times:
+        allowed, state, retry = algorithm.step(state, now)
+        out.append((allowed, retry))
+    return out
+
+
+# ---------- algorithms ----------
+
+def test_token_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=2, burst=3)
+    state = bucket.initial(0.0)
+    results = []
+    for now in (0.0, 0.0, 0.0, 0.0):
+        allowed, state, retry = bucket.step(state, now)
+        results.append((allowed, retry))
+    assert results == [(True, 0.0), (True, 0.0), (True, 0.0), (False, 0.5)]
+    allowed, state, _ = bucket.step(state, 0.5)  # one token back after 1/rate seconds
+    assert allowed
+    allowed, state, retry = bucket.step(state, 0.5)
+    assert not allowed and retry == pytest.approx(0.5)
+
+
+def test_token_bucket_refill_is_capped_at_burst():
+    bucket = TokenBucket(rate=1, burst=2)
+    state = (0.0, 0.0, 0.0)
+    for _ in range(2):
+        allowed, state, _ = bucket.step(state, 1000.0)
+        assert allowed
+    assert not bucket.step(state, 1000.0)[0]
+    assert bucket.idle_after == 2.0
+
+
+def test_sliding_window_limit_and_retry_within_window():
+    window = SlidingWindowCounter(limit=10, window=60)
+    results = _run(window, [0.0] * 11)
+    assert all(allowed for allowed, _ in results[:10])
+    assert results[10] == (False, 60.0)
+
+
+def test_sliding_window_weights_previous_window():
+    window = SlidingWindowCounter(limit=10, window=60)
+    state = window.initial(0.0)
+    for _ in range(10):
+        _, state, _ = window.step(state, 0.0)
+    # new window: the full previous count still overlaps, so no room yet
+    allowed, state, retry = window.step(state, 60.0)
+    assert not allowed and retry == pytest.approx(6.0)
+    # 10% into it: 10 * 0.9 + 0 + 1 == limit
+    allowed, state, _ = window.step(state, 66.0)
+    assert allowed
+
+
+def test_sliding_window_forgets_after_two_windows():
+    window = SlidingWindowCounter(limit=2, window=10)
+    state = window.initial(0.0)
+    for _ in range(2):
+        _, state, _ = window.step(state, 0.0)
+    allowed, state, _ = window.step(state, 25.0)  # the window before last doesn't count
+    assert allowed and state[2] == 0.0
+
+
+# ---------- backends ----------
+
+def test_memory_backend_evicts_idle_keys():
+    backend = MemoryBackend()
+    bucket = TokenBucket(rate=1, burst=1)  # idle_after = 1s
+    assert backend.hit("a", bucket, 0.0) == (True, 0.0)
+    assert backend.hit("a", bucket, 0.0)[0] is False
+    backend.hit("b", bucket, 5.0)  # "a" expired at 1.0
+    assert len(backend) == 1
+    assert backend.hit("a", bucket, 5.0) == (True, 0.0)  # fresh state, not the drained one
+
+
+def test_memory_backend_max_keys_drops_least_recent():
+    backend = MemoryBackend(max_keys=2)
+    bucket = TokenBucket(rate=1, burst=1)
+    backend.hit("a", bucket, 0.0)
+    backend.hit("b", bucket, 0.0)
+    backend.hit("a", bucket, 0.0)  # "a" is now the most recent
+    backend.hit("c", bucket, 0.0)
+    assert len(backend) == 2
+    assert backend.hit("a", bucket, 0.0)[0] is False  # kept: still drained
+    assert backend.hit("b", bucket, 0.0)[0] is True   # dropped: starts over
+
+
+def test_sqlite_backends_share_one_budget(tmp_path):
+    db = str(tmp_path / "ratelimit.db")
+    worker1, worker2 = SQLiteBackend(db), SQLiteBackend(db)  # e.g. two prefork workers
+    bucket = TokenBucket(rate=1, burst=2)
+    assert worker1.hit("ip", bucket, 0.0)[0]
+    assert worker2.hit("ip", bucket, 0.0)[0]
+    allowed, retry = worker1.hit("ip", bucket, 0.0)
+    assert not allowed and retry == pytest.approx(1.0)
+    assert worker2.hit("ip", bucket, 1.0)[0]
+
+
+def test_sqlite_backend_sweeps_expired_rows(tmp_path):
+    db = str(tmp_path / "ratelimit.db")
+    backend = SQLiteBackend(db, sweep_every=2)
+    bucket = TokenBucket(rate=1, burst=1)
+    backend.hit("old", bucket, 0.0)
+    backend.hit("new", bucket, 100.0)  # second hit: sweeps "old", expired at 1.0
+    rows = ratelimit.simpledb.query_all("SELECT key FROM rate_limits", db_path=db)
+    assert [r["key"] for r in rows] == ["new"]
+
+
+# ---------- middleware ----------
+
+def test_middleware_answers_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(time=lambda: 1000.0))
+    limiter = RateLimiter(TokenBucket(rate=0.5, burst=1))
+    handler = rate_limit(limiter, scope="login", error={"error": "slow down"})(lambda request: "ok")
+    request = {"ip": "1.2.3.4"}
+    assert handler(request) == "ok"
+    assert handler(request) == ({"error": "slow down"}, 429, {"Retry-After": "2"})
+    assert handler({"ip": "5.6.7.8"}) == "ok"  # budgets are per key
+    assert limiter.rejected == 1
+
+
+def test_retry_after_is_at_least_one_second(monkeypatch):
+    monkeypatch.setattr(ratelimit, "time", SimpleNamespace(time=lambda: 1000.0))
+    handler = rate_limit(RateLimiter(TokenBucket(rate=100, burst=1)))(lambda request: "ok")
+    handler({"ip": "a"})
+    assert handler({"ip": "a"})[2] == {"Retry-After": "1"}
+
+
+class RecordingSQLiteBackend(SQLiteBackend):
+    def __init__(self, db_path, delay=0.0):
+        super().__init__(db_path)
+        self.delay = delay
+        self.threads = []
+
+    def hit(self, key, algorithm, now):
+        self.threads.append(threading.current_thread())
+        time.sleep(self.delay)
+        return super().hit(key, algorithm, now)
+
+
+def test_blocking_backend_runs_off_the_event_loop(tmp_path):
+    backend = RecordingSQLiteBackend(str(tmp_path / "ratelimit.db"))
+    handler = rate_limit(RateLimiter(TokenBucket(rate=1, burst=1), backend))(lambda request: "ok")
+
+    async def call_twice():
+        return [await handler({"ip": "a"}), await handler({"ip": "a"})]
+
+    ok, limited = asyncio.run(call_twice())
+    assert ok == "ok" and limited[1] == 429
+    assert all(t is not threading.main_thread() for t in backend.threads)
+    assert handler({"ip": "b"}) == "ok"  # no running loop (threaded engine): called inline
+    assert backend.threads[-1] is threading.main_thread()
+    ratelimit.simpledb.close_all()
+
+
+def test_slow_sqlite_limit_does_not_stall_the_async_engine(tmp_path, serve_async_app):
+    backend = RecordingSQLiteBackend(str(tmp_path / "ratelimit.db"), delay=1.0)  # e.g. waiting on a lock
+    app = App(access_log=AccessLog(None))
+    app.route("/login", methods=["POST"], middlewares=[rate_limit(RateLimiter(TokenBucket(1, 5), backend))])(
+        lambda request: {"ok": True})
+    app.route("/health")(lambda request: {"status": "ok"})
+    base, _stop = serve_async_app(app)
+
+    login = threading.Thread(target=lambda: urllib.request.urlopen(
+        urllib.request.Request(base + "/login", method="POST", data=b"{}"), timeout=5).read())
+    login.start()
+    time.sleep(0.2)  # the limiter is now sleeping
+    started = time.monotonic()
+    with urllib.request.urlopen(base + "/health", timeout=5) as resp:
+        assert resp.status == 200
+    assert time.monotonic() - started < 0.5
+    login.join(5)
+    ratelimit.simpledb.close_all()
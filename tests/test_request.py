@@ -0,0 +1,114 @@
+import http.client
+import io
+import json
+import socket
+import urllib.error
+import urllib.request
+
+import pytest
+
+from backend.accesslog import AccessLog
+from backend.app import App
+from backend.request import Request
+
+
+def _request(method="POST", body=b'{"title": "x"}', query="page=2&tag=a&tag=b", headers=None):
+    raw = b"".join(f"{k}: {v}\r\n".encode() for k, v in (headers or {"Content-Type": "application/json"}).items())
+    reads = []
+
+    def read_body():
+        reads.append(1)
+        return body
+
+    req = Request(method, "/todos", http.client.parse_headers(io.BytesIO(raw + b"\r\n")), query,
+                  {"id": 3}, read_body, "10.0.0.1")
+    return req, reads
+
+
+def test_fields_behave_like_the_old_dict():
+    req, _ = _request()
+    assert req["method"] == "POST" and req["path"] == "/todos" and req["ip"] == "10.0.0.1"
+    assert req["params"] == {"id": 3}
+    assert req["query"] == {"page": "2", "tag": ["a", "b"]}
+    assert req["headers"]["Content-Type"] == "application/json"
+    assert req.get("json") == {"title": "x"}
+    assert "json" in req and "user" not in req
+    assert req.get("user") is None and req.get("user", 1) == 1
+    with pytest.raises(KeyError):
+        req["user"]
+
+
+def test_extra_keys_set_by_middleware():
+    req, _ = _request()
+    req["user"] = {"id": 1}
+    assert req["user"] == {"id": 1} and req.get("user") == {"id": 1} and "user" in req
+    assert dict(req) == {"method": "POST", "path": "/todos", "headers": {"Content-Type": "application/json"},
+                         "query": {"page": "2", "tag": ["a", "b"]}, "params": {"id": 3},
+                         "json": {"title": "x"}, "ip": "10.0.0.1", "user": {"id": 1}}
+    assert len(req) == len(Request.FIELDS) + 1
+    del req["user"]
+    assert "user" not in req
+    with pytest.raises(KeyError):
+        del req["method"]
+
+
+def test_fields_can_be_overwritten():
+    req, _ = _request()
+    req["json"] = {"replaced": True}
+    req["headers"] = {"X": "1"}
+    assert req["json"] == {"replaced": True} and req.header("X") == "1"
+
+
+def test_body_is_read_lazily_and_once():
+    req, reads = _request()
+    assert reads == []
+    assert req.header("content-type") == "application/json"  # case-insensitive, no body read
+    assert reads == []
+    assert req["json"] == {"title": "x"} and req.body == b'{"title": "x"}'
+    assert reads == [1]
+
+
+def test_json_is_none_for_get_and_invalid_bodies():
+    req, reads = _request(method="GET")
+    assert req["json"] is None and reads == []
+    assert _request(body=b"{nope")[0]["json"] is None
+    assert _request(body=b"")[0]["json"] is None
+
+
+# ---------- over HTTP ----------
+
+@pytest.fixture
+def echo_app(serve_app):
+    app = App(access_log=AccessLog(None), max_body_size=64)
+
+    @app.route("/echo", methods=["POST"])
+    def echo(request):
+        return {"json": request["json"], "user": request.get("user")}
+
+    return serve_app(app)
+
+
+def test_handler_receives_json(echo_app):
+    req = urllib.request.Request(echo_app + "/echo", method="POST", data=json.dumps({"a": 1}).encode())
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        assert json.loads(resp.read()) == {"json": {"a": 1}, "user": None}
+
+
+def test_oversized_body_gets_413_without_being_read(echo_app):
+    req = urllib.request.Request(echo_app + "/echo", method="POST", data=b"x" * 65)
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(req, timeout=5)
+    assert e.value.code == 413
+    assert json.loads(e.value.read()) == {"error": "Request body too large", "max_bytes": 64}
+
+
+def test_413_closes_connection_instead_of_reading_the_body(echo_app):
+    host, port = echo_app.rsplit("/", 1)[1].split(":")
+    with socket.create_connection((host, int(port)), timeout=5) as sock:
+        # announce a huge body but send none of it: the reply must not wait for it
+        sock.sendall(b"POST /echo HTTP/1.1\r\nHost: x\r\nContent-Length: 100000000\r\n\r\n")
+        data = b""
+        while chunk := sock.recv(4096):
+            data += chunk
+    head = data.split(b"\r\n\r\n", 1)[0].decode("latin-1")
+    assert head.startswith("HTTP/1.1 413") and "Connection: close" in head
@@ -0,0 +1,85 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from backend.accesslog import AccessLog
+from backend.app import App
+from backend.router import Router
+
+
+def _router(*patterns):
+    router = Router()
+    for pattern in patterns:
+        router.add(pattern, {"GET": pattern})  # the handler is the pattern, for easy asserts
+    return router
+
+
+def test_static_route_beats_param_route():
+    router = _router("/todos/:id", "/todos/batch")
+    assert router.match("/todos/batch") == (router.static["/todos/batch"], {})
+    route, params = router.match("/todos/42")
+    assert route.pattern == "/todos/:id" and params == {"id": "42"}
+
+
+def test_literal_trie_segment_beats_param():
+    router = _router("/users/:id/todos", "/users/me/todos")
+    assert router.match("/users/me/todos")[0].pattern == "/users/me/todos"
+    route, params = router.match("/users/7/todos")
+    assert route.pattern == "/users/:id/todos" and params == {"id": "7"}
+
+
+def test_falls_back_to_param_when_literal_branch_dead_ends():
+    router = _router("/a/b/c", "/a/:x/d")
+    route, params = router.match("/a/b/d")
+    assert route.pattern == "/a/:x/d" and params == {"x": "b"}
+
+
+def test_int_converter():
+    router = _router("/todos/:id<int>/toggle")
+    assert router.match("/todos/12/toggle")[1] == {"id": 12}
+    for bad in ("/todos/abc/toggle", "/todos/+5/toggle", "/todos/1_000/toggle", "/todos//toggle"):
+        assert router.match(bad) == (None, None), bad
+
+
+def test_typed_params_tried_in_order():
+    router = _router("/files/:id<int>", "/files/:name")
+    assert router.match("/files/3")[1] == {"id": 3}
+    assert router.match("/files/readme")[1] == {"name": "readme"}
+
+
+def test_unknown_converter_raises_at_registration():
+    with pytest.raises(ValueError, match="unknown converter"):
+        Router().add("/todos/:id<uuid>", {})
+
+
+def test_lookup_404_and_405():
+    router = Router()
+    router.add("/todos/:id<int>", {"DELETE": "delete", "PATCH": "patch"})
+    assert router.lookup("GET", "/nope") == (None, None, None, None)
+    handler, params, route, allowed = router.lookup("GET", "/todos/5")
+    assert handler is None and allowed == ["DELETE", "PATCH"] and params == {"id": 5}
+    assert router.lookup("DELETE", "/todos/5")[0] == "delete"
+
+
+def _get(url, method="GET"):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, method=method), timeout=5) as resp:
+            return resp.status, dict(resp.headers), json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), json.loads(e.read())
+
+
+def test_http_404_405_and_params(serve_app):
+    app = App(access_log=AccessLog(None))
+
+    @app.route("/todos/:id<int>/toggle", methods=["PATCH"])
+    def toggle(request):
+        return {"id": request["params"]["id"]}
+
+    base = serve_app(app)
+    assert _get(base + "/todos/7/toggle", "PATCH")[::2] == (200, {"id": 7})
+    assert _get(base + "/todos/abc/toggle", "PATCH")[0] == 404
+    status, headers, _ = _get(base + "/todos/7/toggle")
+    assert status == 405 and headers["Allow"] == "PATCH"
@@ -0,0 +1,161 @@
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from backend.server import KeepAliveHandler, make_server
+
+
+class Hello(KeepAliveHandler):
+    timeout = 5
+
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = make_server(Hello, "127.0.0.1", 0, threads=2)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _get(conn, path="/"):
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    return resp.status, resp.read(), resp
+
+
+def test_keep_alive_reuses_connection(server):
+    conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+    for _ in range(3):
+        status, body, resp = _get(conn)
+        assert (status, body) == (200, b"ok")
+        assert resp.getheader("Connection") != "close"
+    conn.close()
+
+
+def test_idle_connections_do_not_starve_new_clients(server):
+    idle = [http.client.HTTPConnection(*server.server_address, timeout=5) for _ in range(2)]
+    for conn in idle:
+        assert _get(conn)[0] == 200  # both pool threads now wait on an idle connection
+    started = time.monotonic()
+    fresh = http.client.HTTPConnection(*server.server_address, timeout=10)
+    assert _get(fresh)[:2] == (200, b"ok")
+    assert time.monotonic() - started < 1.0  # not the 5s keep-alive timeout
+    for conn in idle + [fresh]:
+        conn.close()
+
+
+def test_bad_content_length_gets_400_and_close(server):
+    with socket.create_connection(server.server_address, timeout=5) as sock:
+        sock.sendall(b"POST / HTTP/1.1\r\nHost: x\r\nContent-Length: abc\r\n\r\n")
+        data = b""
+        while chunk := sock.recv(4096):
+            data += chunk  # the server closes the connection after its reply
+    head = data.split(b"\r\n\r\n", 1)[0].decode("latin-1")
+    assert head.startswith("HTTP/1.1 400")
+    assert "Connection: close" in head
+
+
+PREFORK_SERVER = textwrap.dedent("""
+    import sys, time
+    from backend.server import KeepAliveHandler, serve_prefork
+
+    class Slow(KeepAliveHandler):
+        def do_GET(self):
+            time.sleep(30)
+
+    serve_prefork(Slow, "127.0.0.1", int(sys.argv[1]), workers=1, threads=2, grace=1.0)
+""")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_listening(port, proc, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and proc.poll() is None:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise AssertionError("prefork server did not start")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="prefork needs fork()")
+def test_prefork_enforces_grace_period_on_sigterm():
+    port = _free_port()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen([sys.executable, "-c", PREFORK_SERVER, str(port)], cwd=root)
+    try:
+        _wait_listening(port, proc)
+        stuck = socket.create_connection(("127.0.0.1", port), timeout=5)
+        stuck.sendall(b"GET / HTTP/1.1\r\nHost: x\r\n\r\n")  # held by the worker for 30s
+        time.sleep(0.3)
+        started = time.monotonic()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=10)  # grace=1.0: the worker is killed, not waited for
+        assert time.monotonic() - started < 5.0
+        stuck.close()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+PREFORK_APP = textwrap.dedent("""
+    import os, sys
+    from backend.accesslog import AccessLog
+    from backend.app import App
+
+    app = App(access_log=AccessLog(None))
+    app.route("/")(lambda request: "ok")
+
+    @app.on_shutdown
+    def record():
+        with open(sys.argv[2], "a") as f:
+            f.write(f"{os.getpid()}\\n")
+
+    app.run(port=int(sys.argv[1]), mode="prefork", workers=2, threads=2)
+""")
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="prefork needs fork()")
+def test_prefork_runs_shutdown_hooks_in_every_worker(tmp_path):
+    port, out = _free_port(), tmp_path / "shutdown.txt"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proc = subprocess.Popen([sys.executable, "-c", PREFORK_APP, str(port), str(out)], cwd=root,
+                            stdout=subprocess.DEVNULL)
+    try:
+        _wait_listening(port, proc)
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=15)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+    pids = [int(line) for line in out.read_text().split()]
+    assert len(pids) == 3 and len(set(pids)) == 3
+    assert pids[-1] == proc.pid  # both workers first, then the master
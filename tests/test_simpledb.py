@@ -0,0 +1,185 @@
+import os
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend import simpledb
+from backend.simpledb import exec, exec_insert, exec_many, exec_returning, query_all, query_one, transaction
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "simple.db")
+    exec("CREATE TABLE items (id INTEGER PRIMARY KEY, title TEXT NOT NULL UNIQUE)", db_path=path)
+    yield path
+    simpledb.close_all()
+
+
+def _other(db):
+    """What another process sees: only committed rows"""
+    conn = sqlite3.connect(db, timeout=0)
+    try:
+        return [r[0] for r in conn.execute("SELECT title FROM items ORDER BY id")]
+    finally:
+        conn.close()
+
+
+# ---------- helpers ----------
+
+def test_exec_insert_returns_the_new_id(db):
+    assert exec_insert("INSERT INTO items(title) VALUES (?)", ("a",), db_path=db) == 1
+    assert exec_insert("INSERT INTO items(title) VALUES (?)", ("b",), db_path=db) == 2
+    assert _other(db) == ["a", "b"]  # committed right away
+
+
+def test_exec_returning_gives_row_dicts(db):
+    rows = exec_returning("INSERT INTO items(title) VALUES (?), (?) RETURNING id, title", ("a", "b"), db_path=db)
+    assert rows == [{"id": 1, "title": "a"}, {"id": 2, "title": "b"}]
+    assert exec_returning("UPDATE items SET title='z' WHERE id=? RETURNING title", (9,), db_path=db) == []
+    assert _other(db) == ["a", "b"]
+
+
+def test_exec_many_writes_all_rows_in_one_commit(db):
+    assert exec_many("INSERT INTO items(title) VALUES (?)", [("a",), ("b",), ("c",)], db_path=db) == 3
+    assert _other(db) == ["a", "b", "c"]
+    with pytest.raises(sqlite3.IntegrityError):
+        exec_many("INSERT INTO items(title) VALUES (?)", [("d",), ("a",)], db_path=db)
+    assert _other(db) == ["a", "b", "c"]  # "d" went with the failing row
+
+
+def test_failed_statement_outside_a_transaction_is_rolled_back(db):
+    exec("INSERT INTO items(title) VALUES ('a')", db_path=db)
+    with pytest.raises(sqlite3.IntegrityError):
+        exec("INSERT INTO items(title) VALUES ('a')", db_path=db)
+    assert not simpledb.get_connection(db).in_transaction
+    assert query_one("SELECT COUNT(*) AS n FROM items", db_path=db) == {"n": 1}
+
+
+# ---------- transaction() ----------
+
+def test_helpers_join_the_transaction_and_commit_once(db):
+    with transaction(db) as conn:
+        exec_insert("INSERT INTO items(title) VALUES (?)", ("a",), db_path=db)
+        exec("INSERT INTO items(title) VALUES ('b')", db_path=db)
+        assert conn.in_transaction
+        assert [r["title"] for r in query_all("SELECT title FROM items", db_path=db)] == ["a", "b"]
+        assert _other(db) == []  # nothing committed yet
+    assert _other(db) == ["a", "b"]
+
+
+def test_failing_statement_rolls_back_earlier_writes(db):
+    exec("INSERT INTO items(title) VALUES ('kept')", db_path=db)
+    with pytest.raises(sqlite3.IntegrityError):
+        with transaction(db):
+            exec("INSERT INTO items(title) VALUES ('a')", db_path=db)
+            exec("UPDATE items SET title='renamed' WHERE title='kept'", db_path=db)
+            exec("INSERT INTO items(title) VALUES ('a')", db_path=db)  # UNIQUE violation
+    assert _other(db) == ["kept"]
+    assert [r["title"] for r in query_all("SELECT title FROM items", db_path=db)] == ["kept"]
+
+
+def test_begin_immediate_takes_the_write_lock_up_front(db):
+    other = sqlite3.connect(db, timeout=0, isolation_level=None)
+    try:
+        with transaction(db):
+            # no write yet, but another writer is already shut out
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other.execute("BEGIN IMMEDIATE")
+        other.execute("BEGIN IMMEDIATE")
+        other.execute("ROLLBACK")
+    finally:
+        other.close()
+
+
+def test_nested_blocks_join_the_outer_one(db):
+    with transaction(db) as outer:
+        exec("INSERT INTO items(title) VALUES ('a')", db_path=db)
+        with transaction(db) as inner:
+            assert inner is outer
+            exec("INSERT INTO items(title) VALUES ('b')", db_path=db)
+        assert _other(db) == []  # the inner block didn't commit
+    assert _other(db) == ["a", "b"]
+
+
+def test_error_in_nested_block_rolls_back_the_whole_unit(db):
+    with pytest.raises(RuntimeError):
+        with transaction(db):
+            exec("INSERT INTO items(title) VALUES ('a')", db_path=db)
+            with transaction(db):
+                exec("INSERT INTO items(title) VALUES ('b')", db_path=db)
+                raise RuntimeError("stop")
+    assert _other(db) == []
+    with transaction(db):  # the depth count is back to zero: this is an outer block again
+        exec("INSERT INTO items(title) VALUES ('c')", db_path=db)
+    assert _other(db) == ["c"]
+
+
+# ---------- connection pool ----------
+
+def test_connection_is_reused_per_thread(db):
+    conn = simpledb.get_connection(db)
+    assert simpledb.get_connection(db) is conn
+    other = []
+    t = threading.Thread(target=lambda: other.append(simpledb.get_connection(db)))
+    t.start()
+    t.join()
+    assert other[0] is not conn
+
+
+def test_connection_used_after_close_all_is_reopened(db):
+    conn = simpledb.get_connection(db)
+    ready, closed, result = threading.Event(), threading.Event(), {}
+
+    def worker():
+        result["before"] = simpledb.get_connection(db)
+        ready.set()
+        closed.wait(5)
+        result["after"] = simpledb.get_connection(db)
+        result["rows"] = query_all("SELECT COUNT(*) AS n FROM items", db_path=db)
+
+    t = threading.Thread(target=worker)
+    t.start()
+    ready.wait(5)
+    simpledb.close_all()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")  # really closed
+    closed.set()
+    t.join(5)
+    assert simpledb.get_connection(db) is not conn
+    assert result["after"] is not result["before"] and result["rows"] == [{"n": 0}]  # every thread, not just ours
+    exec("INSERT INTO items(title) VALUES ('a')", db_path=db)
+    assert _other(db) == ["a"]
+
+
+def test_forked_child_opens_its_own_connection(db):
+    parent = simpledb.get_connection(db)
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            child = simpledb.get_connection(db)
+            exec("INSERT INTO items(title) VALUES ('from child')", db_path=db)
+            ok = child is not parent and parent not in simpledb._open_conns
+            os.write(write_fd, b"ok" if ok else b"shared")
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as f:
+        assert f.read() == b"ok"
+    os.waitpid(pid, 0)
+    assert simpledb.get_connection(db) is parent  # the parent keeps its own
+    assert [r["title"] for r in query_all("SELECT title FROM items", db_path=db)] == ["from child"]
+
+
+def test_changed_pid_starts_a_fresh_pool(db, monkeypatch):
+    parent = simpledb.get_connection(db)
+    for name in ("_pid", "_open_conns"):
+        monkeypatch.setattr(simpledb, name, getattr(simpledb, name))  # put back afterwards
+    child_pid = os.getpid() + 1
+    monkeypatch.setattr(simpledb, "os", SimpleNamespace(getpid=lambda: child_pid))  # as if forked
+    fresh = simpledb.get_connection(db)
+    assert fresh is not parent and simpledb._open_conns == [fresh]
+    assert simpledb.get_connection(db) is fresh
+    fresh.close()
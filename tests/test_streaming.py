@@ -0,0 +1,134 @@
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from backend import simpledb
+from backend.accesslog import AccessLog
+from backend.app import App, Stream
+from backend.auth import create_token
+from backend.migrations import migrate
+from examples.hello_world.backend import main
+
+
+@pytest.fixture(params=["threaded", "async"])
+def serve(request, serve_app, serve_async_app):
+    """serve(app) -> base URL, once per engine"""
+    if request.param == "threaded":
+        return serve_app
+    return lambda app: serve_async_app(app)[0]
+
+
+def _address(base):
+    host, port = base.rsplit("/", 1)[1].split(":")
+    return host, int(port)
+
+
+def _raw(base, data):
+    """-> (head, body) read until the server closes the connection"""
+    with socket.create_connection(_address(base), timeout=5) as sock:
+        sock.sendall(data)
+        out = b""
+        while chunk := sock.recv(65536):
+            out += chunk
+    head, _, body = out.partition(b"\r\n\r\n")
+    return head.decode("latin-1"), body
+
+
+@pytest.fixture
+def stream_app():
+    app = App(access_log=AccessLog(None))
+    closed = threading.Event()
+
+    @app.route("/rows")
+    def rows(request):
+        return Stream(({"n": i} for i in range(3)), headers={"X-Rows": "3"})
+
+    @app.route("/text")
+    def text(request):
+        return Stream(iter(["a,b\n", b"1,2\n"]), content_type="text/csv")
+
+    @app.route("/endless")
+    def endless(request):
+        def chunks():
+            try:
+                while True:
+                    yield b"x" * 65536
+            finally:
+                closed.set()
+        return chunks()
+
+    @app.route("/broken")
+    def broken(request):
+        def chunks():
+            yield b"x" * 20000  # more than one write buffer, so it goes out before the error
+            raise RuntimeError("database went away")
+        return chunks()
+
+    return app, closed
+
+
+def test_chunked_ndjson(serve, stream_app):
+    base = serve(stream_app[0])
+    conn = http.client.HTTPConnection(*_address(base), timeout=5)
+    conn.request("GET", "/rows")
+    resp = conn.getresponse()
+    assert resp.status == 200 and resp.getheader("Transfer-Encoding") == "chunked"
+    assert resp.getheader("Content-Length") is None and resp.getheader("X-Rows") == "3"
+    assert resp.getheader("Content-Type") == "application/x-ndjson"
+    assert [json.loads(line) for line in resp.read().splitlines()] == [{"n": 0}, {"n": 1}, {"n": 2}]
+    conn.request("GET", "/text")  # same connection: the chunked body was properly terminated
+    resp = conn.getresponse()
+    assert resp.getheader("Content-Type") == "text/csv" and resp.read() == b"a,b\n1,2\n"
+    conn.close()
+
+
+def test_http10_body_ends_at_close(serve, stream_app):
+    head, body = _raw(serve(stream_app[0]), b"GET /rows HTTP/1.0\r\n\r\n")
+    assert head.split("\r\n")[0].endswith("200 OK")
+    assert "Transfer-Encoding" not in head and "Content-Length" not in head
+    assert "Connection: close" in head
+    assert [json.loads(line) for line in body.splitlines()] == [{"n": 0}, {"n": 1}, {"n": 2}]
+
+
+def test_client_disconnect_closes_the_source(serve, stream_app):
+    app, closed = stream_app
+    with socket.create_connection(_address(serve(app)), timeout=5) as sock:
+        sock.sendall(b"GET /endless HTTP/1.1\r\nHost: x\r\n\r\n")
+        assert sock.recv(65536).startswith(b"HTTP/1.1 200")
+    assert closed.wait(10)
+
+
+def test_error_after_headers_cuts_the_stream_short(serve, stream_app):
+    head, body = _raw(serve(stream_app[0]), b"GET /broken HTTP/1.1\r\nHost: x\r\n\r\n")
+    assert head.startswith("HTTP/1.1 200") and "Transfer-Encoding: chunked" in head
+    assert body.startswith(b"4e20\r\n" + b"x" * 20000)  # what was produced before the error
+    assert not body.endswith(b"0\r\n\r\n")  # no terminating chunk: the client sees a truncated body
+
+
+@pytest.fixture
+def todo_user(tmp_path, monkeypatch):
+    monkeypatch.setattr(simpledb, "DB_PATH", str(tmp_path / "export.db"))
+    migrate(main.MIGRATIONS)
+    uid = simpledb.exec_insert("INSERT INTO users(email, password_hash) VALUES (?, ?)", ("e@example.com", b"-"))
+    simpledb.exec_many("INSERT INTO todos(user_id, title, done) VALUES (?, ?, ?)",
+                       [(uid, "one", 0), (uid, "two", 1), (uid, "three", 0)])
+    yield uid, create_token(uid, "e@example.com")
+    simpledb.close_all()
+
+
+def test_todos_export_streams_ndjson(serve, todo_user):
+    uid, token = todo_user
+    base = serve(main.app)
+    conn = http.client.HTTPConnection(*_address(base), timeout=5)
+    conn.request("GET", "/todos/export", headers={"Authorization": f"Bearer {token}"})
+    resp = conn.getresponse()
+    assert resp.status == 200 and resp.getheader("Transfer-Encoding") == "chunked"
+    assert resp.getheader("Content-Disposition") == 'attachment; filename="todos.ndjson"'
+    rows = [json.loads(line) for line in resp.read().splitlines()]
+    assert [(r["title"], r["done"]) for r in rows] == [("three", False), ("two", True), ("one", False)]
+    conn.request("GET", "/todos/export")
+    assert conn.getresponse().status == 401
+    conn.close()